@@ -39,7 +39,7 @@ long_description = read_content("docs/README.rst") + read_content(
     os.path.join("docs/", "CHANGELOG.rst")
 )
 
-extras_require = {"reST": ["Sphinx"]}
+extras_require = {"reST": ["Sphinx"], "async": ["httpx"], "fast": ["fastjsonschema"]}
 if os.environ.get("READTHEDOCS", None):
     extras_require["reST"].append("recommonmark")
 
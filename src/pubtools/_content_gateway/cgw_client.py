@@ -1,5 +1,7 @@
 import json
-from .cgw_session import CGWSession
+import time
+
+from .cgw_session import CONNECT_TIMEOUT, READ_TIMEOUT, AsyncCGWSession, CGWSession
 
 
 class CGWClientError(Exception):
@@ -12,7 +14,18 @@ class CGWClientError(Exception):
 class CGWClient:
     """Class for performing content gateway HTTP API operations."""
 
-    def __init__(self, hostname, cgw_auth=None, verify=True):
+    def __init__(
+        self,
+        hostname,
+        cgw_auth=None,
+        verify=True,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+    ):
         """
         Initialize.
 
@@ -23,6 +36,19 @@ class CGWClient:
                 CGWBasicAuth subclass instance
             verify (bool)
                 enable/disable SSL verification
+            pool_connections (int)
+                number of connection pools (hosts) to cache
+            pool_maxsize (int)
+                maximum number of connections kept alive per host
+            pool_block (bool)
+                wait for a free connection when all pooled connections are in use
+            connect_timeout (float|None)
+                seconds to wait for a connection, None waits forever
+            read_timeout (float|None)
+                seconds to wait for the server response, None waits forever
+            rate_limit (float|None)
+                maximum number of requests per second, None doesn't limit
+                the requests until the server throttles them
 
         """
 
@@ -31,10 +57,43 @@ class CGWClient:
         if not self.hostname:
             raise CGWClientError("No content gateway hostname found")
         self.hostname = hostname.rstrip("/")
-        self.cgw_session = CGWSession(self.hostname, verify=verify)
+        self.cgw_session = CGWSession(
+            self.hostname,
+            verify=verify,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            rate_limit=rate_limit,
+        )
         if cgw_auth:
             cgw_auth.make_auth(self.cgw_session)
 
+    def set_deadline(self, seconds):
+        """
+        Stop sending requests the given number of seconds from now.
+
+        The timeouts of the requests sent before are shortened so that
+        none of them waits past the deadline.
+
+        Args:
+            seconds (float|None):
+                seconds until the deadline, None removes the deadline
+        """
+
+        self.cgw_session.deadline = None if seconds is None else time.monotonic() + seconds
+
+    def pool_stats(self):
+        """
+        Get statistics of the HTTP connection pool.
+
+        Returns (dict):
+            Returns numbers of connections opened, reused and discarded.
+        """
+
+        return self.cgw_session.pool_stats()
+
     def call_cgw_api(self, method, endpoint, data=None):
         """
         Perform an HTTP API request on content gateway registry.
@@ -562,3 +621,128 @@ class CGWClient:
         endpoint = "/products/%s/versions/%s/internals/%s" % (pid, vid, iid)
         resp_data = self.call_cgw_api("DELETE", endpoint)
         return resp_data
+
+
+class AsyncCGWClient(CGWClient):
+    """Class for performing content gateway HTTP API operations asynchronously.
+
+    Every API method of :class:`CGWClient` is available and returns an
+    awaitable instead of the response data, e.g.::
+
+        async with AsyncCGWClient(hostname, cgw_auth) as client:
+            products, versions = await asyncio.gather(client.get_products(), client.get_versions(pid))
+
+    Requires the optional `httpx` dependency.
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(
+        self,
+        hostname,
+        cgw_auth=None,
+        verify=True,
+        pool_maxsize=10,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+        transport=None,
+    ):
+        """
+        Initialize.
+
+        Args:
+            hostname (str):
+                CGW host URL.
+            cgw_auth (CGWBasicAuth):
+                CGWBasicAuth subclass instance
+            verify (bool)
+                enable/disable SSL verification
+            pool_maxsize (int)
+                maximum number of connections kept alive
+            pool_block (bool)
+                never open more than pool_maxsize connections
+            connect_timeout (float|None)
+                seconds to wait for a connection, None waits forever
+            read_timeout (float|None)
+                seconds to wait for the server response, None waits forever
+            rate_limit (float|None)
+                maximum number of requests per second, None doesn't limit
+                the requests until the server throttles them
+            transport (httpx.AsyncBaseTransport)
+                optional transport used instead of the network one
+        """
+
+        self.hostname = hostname
+        # Check if CGW hostname is present
+        if not self.hostname:
+            raise CGWClientError("No content gateway hostname found")
+        self.hostname = hostname.rstrip("/")
+        self.cgw_session = AsyncCGWSession(
+            self.hostname,
+            verify=verify,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            rate_limit=rate_limit,
+            transport=transport,
+        )
+        if cgw_auth:
+            cgw_auth.make_auth(self.cgw_session)
+
+    async def __aenter__(self):
+        """Use the client as an async context manager closing it on exit."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the client."""
+        await self.close()
+
+    async def close(self):
+        """Close the connections of the client."""
+
+        await self.cgw_session.close()
+
+    async def call_cgw_api(self, method, endpoint, data=None):
+        """
+        Perform an asynchronous HTTP API request on content gateway registry.
+
+        Args:
+            method (str):
+                REST API method of the request (GET, POST, PUT, DELETE).
+            endpoint (str):
+                Endpoint of the request.
+            data (dict):
+                Optional arguments for the method Request object.
+
+        Returns (list|dict|int):
+            Returns either list or dict response for GET method
+            and int for PUT methods.
+
+        Raises:
+            CGWClientError: When the request returns an error status.
+            Exception: Occurs if API call fails.
+        """
+
+        # Check if correct method id passed
+        if method not in ["GET", "POST", "PUT", "DELETE"]:
+            raise CGWClientError("Wrong request method passed")
+
+        output = {}
+        try:
+            response = await self.cgw_session.request(method, endpoint, data=data)
+        except Exception as e:
+            msg = "Error: Exception occurred during API call: %s" % str(e)
+            raise CGWClientError(msg)
+
+        if response.is_error:
+            raise CGWClientError(
+                "content gateway API returned error: "
+                "\nstatus_code: %s, reason: %s, error: %s"
+                % (response.status_code, response.reason_phrase, response.text)
+            )
+
+        if response.text:
+            output = response.json()
+        return output
@@ -1,12 +1,257 @@
+import asyncio
+import time
+
 import requests
 from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from requests.packages.urllib3.util.retry import Retry
 
+from .rate_limiter import THROTTLE_STATUSES, RateLimiter, jittered, parse_retry_after
+
+try:
+    import httpcore
+    import httpx
+except ImportError:  # pragma: no cover
+    httpcore = httpx = None
+
+# HTTP statuses retried by both the sync and the async sessions
+RETRY_STATUSES = frozenset(range(500, 512)) | THROTTLE_STATUSES
+# upper limit of a single backoff, same as urllib3
+BACKOFF_MAX = 120
+# default fraction of the backoff randomly left out, so that the workers don't retry at once
+BACKOFF_JITTER = 0.5
+# default seconds to wait for a connection and for a response
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+
+def backoff_time(retry_number, backoff_factor, jitter=0):
+    """Backoff before the given retry, following the urllib3 Retry policy.
+
+    Args:
+        retry_number (int)
+            1-based number of the upcoming retry
+        backoff_factor (int)
+            backoff factor to apply between attempts after the second try
+        jitter (float)
+            fraction of the backoff which may be randomly left out
+    Returns:
+        float: seconds to wait
+    """
+
+    if retry_number <= 1:
+        return 0
+    return jittered(min(BACKOFF_MAX, backoff_factor * (2 ** (retry_number - 1))), jitter)
+
+
+def deadline_timeout(timeout, deadline):
+    """Cap the connect and read timeouts by the time remaining until the deadline.
+
+    Args:
+        timeout (tuple)
+            (connect, read) timeouts in seconds, None means no limit
+        deadline (float|None)
+            time.monotonic() value after which no request is sent
+
+    Returns:
+        tuple: (connect, read) timeouts of the next request
+
+    Raises:
+        requests.exceptions.Timeout: When the deadline has passed
+    """
+
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise requests.exceptions.Timeout("CGW push deadline exceeded")
+    return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+
+
+class _DiscardCountingPoolMixin(object):
+    """Count connections discarded because the connection pool was full."""
+
+    num_discarded = 0
+
+    def _put_conn(self, conn):
+        if conn is not None and self.pool is not None and self.pool.full():
+            self.num_discarded += 1
+        super(_DiscardCountingPoolMixin, self)._put_conn(conn)
+
+
+class _CountingHTTPConnectionPool(_DiscardCountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_DiscardCountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _AsyncCountingPoolMixin(object):
+    """Count requests, opened connections and idle connections closed because the pool was full."""
+
+    num_requests = 0
+    num_connections = 0
+    num_discarded = 0
+
+    async def handle_async_request(self, request):
+        self.num_requests += 1
+        return await super(_AsyncCountingPoolMixin, self).handle_async_request(request)
+
+    def create_connection(self, origin):
+        self.num_connections += 1
+        return super(_AsyncCountingPoolMixin, self).create_connection(origin)
+
+    def _assign_requests_to_connections(self):
+        closing = super(_AsyncCountingPoolMixin, self)._assign_requests_to_connections()
+        # expired connections are closed even when the pool isn't full
+        self.num_discarded += sum(1 for connection in closing if not connection.has_expired())
+        return closing
+
+
+if httpcore is not None:
+
+    class _CountingAsyncConnectionPool(_AsyncCountingPoolMixin, httpcore.AsyncConnectionPool):
+        pass
+
+
+class CGWRetry(Retry):
+    """Retry with a jittered backoff reporting throttled responses to a RateLimiter.
+
+    The Retry-After header is honored by urllib3 already, the limiter makes
+    the other requests wait for it too. No backoff is longer than
+    BACKOFF_MAX or lasts past the deadline of the limiter.
+    """
+
+    def __init__(self, *args, limiter=None, jitter=0, **kwargs):
+        """Initializing.
+
+        Args:
+            limiter (RateLimiter|None)
+                rate limiter of the session
+            jitter (float)
+                fraction of the backoff which may be randomly left out
+        """
+        super(CGWRetry, self).__init__(*args, **kwargs)
+        self.limiter = limiter
+        self.jitter = jitter
+
+    def new(self, **kwargs):
+        """Copy of the retry with the limiter and jitter kept."""
+        kwargs.setdefault("limiter", self.limiter)
+        kwargs.setdefault("jitter", self.jitter)
+        return super(CGWRetry, self).new(**kwargs)
+
+    def _cap(self, seconds):
+        """Shorten the wait to BACKOFF_MAX and to the time left until the deadline."""
+        seconds = min(seconds, BACKOFF_MAX)
+        if self.limiter is not None:
+            seconds = self.limiter.cap(seconds)
+        return seconds
+
+    def get_backoff_time(self):
+        """Jittered urllib3 backoff."""
+        return self._cap(jittered(super(CGWRetry, self).get_backoff_time(), self.jitter))
+
+    def get_retry_after(self, response):
+        """Seconds of the Retry-After header, capped like the backoff."""
+        retry_after = super(CGWRetry, self).get_retry_after(response)
+        return None if retry_after is None else self._cap(retry_after)
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        """Report a throttled response to the limiter before counting the retry."""
+        if self.limiter is not None and response is not None and response.status in THROTTLE_STATUSES:
+            self.limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+        return super(CGWRetry, self).increment(method, url, response, *args, **kwargs)
+
+    def sleep(self, response=None):
+        """Wait for the backoff and for the rate limiter before the retry.
+
+        Raises:
+            requests.exceptions.Timeout: When the deadline has passed
+        """
+        super(CGWRetry, self).sleep(response)
+        if self.limiter is not None:
+            self.limiter.wait()
+            deadline_timeout((None, None), self.limiter.deadline)
+
+
+class CGWHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter keeping statistics of its connection pools and limiting the request rate."""
+
+    def __init__(self, *args, limiter=None, **kwargs):
+        """Initializing.
+
+        Args:
+            limiter (RateLimiter|None)
+                rate limiter every request waits for
+        """
+        self.limiter = limiter
+        super(CGWHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        """Send the request once the rate limiter allows it and report throttled responses.
+
+        Retried responses are reported by :class:`CGWRetry`, the others
+        (e.g. of methods which are not retried) are reported here.
+        """
+        if self.limiter is None:
+            return super(CGWHTTPAdapter, self).send(request, *args, **kwargs)
+        self.limiter.wait()
+        if isinstance(kwargs.get("timeout"), tuple):
+            # the wait shortens the time left until the deadline
+            kwargs["timeout"] = deadline_timeout(kwargs["timeout"], self.limiter.deadline)
+        response = super(CGWHTTPAdapter, self).send(request, *args, **kwargs)
+        if response.status_code in THROTTLE_STATUSES:
+            self.limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+        else:
+            self.limiter.on_success()
+        return response
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(CGWHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def pool_stats(self):
+        """Connection statistics of the live connection pools.
+
+        Returns:
+            dict: numbers of connections `opened`, `reused` for another request
+            and `discarded` because the pool was full
+        """
+
+        stats = {"opened": 0, "reused": 0, "discarded": 0}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["opened"] += pool.num_connections
+            stats["reused"] += max(0, pool.num_requests - pool.num_connections)
+            stats["discarded"] += getattr(pool, "num_discarded", 0)
+        return stats
+
 
 class CGWSession(object):
     """Helper class to support cgw requests and authentication."""
 
-    def __init__(self, hostname, retries=3, verify=True, backoff_factor=2):
+    def __init__(
+        self,
+        hostname,
+        retries=3,
+        verify=True,
+        backoff_factor=2,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+        jitter=BACKOFF_JITTER,
+    ):
         """Initializing.
 
         Args:
@@ -18,24 +263,60 @@ class CGWSession(object):
                 enable/disable SSL verification
             backoff_factor (int)
                 backoff factor to apply between attempts after the second try
+            pool_connections (int)
+                number of connection pools (hosts) to cache
+            pool_maxsize (int)
+                maximum number of connections kept alive per host
+            pool_block (bool)
+                wait for a free connection instead of opening a connection
+                which is discarded afterwards when the pool is full
+            connect_timeout (float|None)
+                seconds to wait for a connection, None waits forever
+            read_timeout (float|None)
+                seconds to wait for the server response, None waits forever
+            rate_limit (float|None)
+                maximum number of requests per second, None doesn't limit
+                the requests until the server throttles them
+            jitter (float)
+                fraction of the backoff which may be randomly left out
         """
         self.session = requests.Session()
         self.hostname = hostname
         self.verify = verify
+        self.timeout = (connect_timeout, read_timeout)
 
-        retry = Retry(
+        self.limiter = RateLimiter(max_rate=rate_limit, max_pause=BACKOFF_MAX)
+        retry = CGWRetry(
             total=retries,
             read=retries,
             connect=retries,
             backoff_factor=backoff_factor,
-            status_forcelist=set(range(500, 512)),
+            status_forcelist=RETRY_STATUSES,
+            limiter=self.limiter,
+            jitter=jitter,
         )
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        self.adapter = CGWHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retry,
+            limiter=self.limiter,
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
         self.session.headers["Content-type"] = "application/json"
         self.session.headers["Accept"] = "application/json"
 
+    @property
+    def deadline(self):
+        """time.monotonic() value after which no request is sent, None for no deadline."""
+        return self.limiter.deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        """Set the deadline shared with the rate limiter, so that it doesn't wait past it."""
+        self.limiter.deadline = value
+
     def get(self, endpoint, **kwargs):
         """HTTP get request against CGW server API
 
@@ -46,6 +327,7 @@ class CGWSession(object):
             requests.Response
         """
 
+        kwargs.setdefault("timeout", self.request_timeout())
         return self.session.get(self._api_url(endpoint), verify=self.verify, **kwargs)
 
     def post(self, endpoint, **kwargs):
@@ -58,6 +340,7 @@ class CGWSession(object):
             requests.Response
         """
 
+        kwargs.setdefault("timeout", self.request_timeout())
         return self.session.post(self._api_url(endpoint), verify=self.verify, **kwargs)
 
     def put(self, endpoint, **kwargs):
@@ -70,6 +353,7 @@ class CGWSession(object):
             requests.Response
         """
 
+        kwargs.setdefault("timeout", self.request_timeout())
         return self.session.put(self._api_url(endpoint), verify=self.verify, **kwargs)
 
     def delete(self, endpoint, **kwargs):
@@ -82,8 +366,28 @@ class CGWSession(object):
             requests.Response
         """
 
+        kwargs.setdefault("timeout", self.request_timeout())
         return self.session.delete(self._api_url(endpoint), verify=self.verify, **kwargs)
 
+    def request_timeout(self):
+        """Timeouts of the next request, capped by the deadline when it is set.
+
+        Returns:
+            tuple: (connect, read) timeouts in seconds
+        """
+
+        return deadline_timeout(self.timeout, self.deadline)
+
+    def pool_stats(self):
+        """Statistics of the kept-alive connections.
+
+        Returns:
+            dict: numbers of connections `opened`, `reused` for another request
+            and `discarded` because the pool was full
+        """
+
+        return self.adapter.pool_stats()
+
     def _api_url(self, endpoint):
         """Basic authentication support for CGClient.
 
@@ -95,3 +399,231 @@ class CGWSession(object):
         """
 
         return "%s%s" % (self.hostname, endpoint)
+
+
+class AsyncCGWSession(object):
+    """Helper class to support asynchronous cgw requests and authentication.
+
+    Requires the optional `httpx` dependency. The retry policy is the same as
+    in :class:`CGWSession`.
+    """
+
+    def __init__(
+        self,
+        hostname,
+        retries=3,
+        verify=True,
+        backoff_factor=2,
+        pool_maxsize=10,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+        jitter=BACKOFF_JITTER,
+        transport=None,
+    ):
+        """Initializing.
+
+        Args:
+            hostname (str)
+                hostname of CG service
+            retries (int)
+                number of http retries
+            verify (bool)
+                enable/disable SSL verification
+            backoff_factor (int)
+                backoff factor to apply between attempts after the second try
+            pool_maxsize (int)
+                maximum number of connections kept alive
+            pool_block (bool)
+                never open more than pool_maxsize connections
+            connect_timeout (float|None)
+                seconds to wait for a connection, None waits forever
+            read_timeout (float|None)
+                seconds to wait for the server response, None waits forever
+            rate_limit (float|None)
+                maximum number of requests per second, None doesn't limit
+                the requests until the server throttles them
+            jitter (float)
+                fraction of the backoff which may be randomly left out
+            transport (httpx.AsyncBaseTransport)
+                optional transport used instead of the network one
+        """
+
+        if httpx is None:
+            raise ImportError(
+                "httpx is required for asynchronous CGW requests, install pubtools-content-gateway[async]"
+            )
+
+        self.hostname = hostname
+        self.verify = verify
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.limiter = RateLimiter(max_rate=rate_limit, max_pause=BACKOFF_MAX)
+        self.timeout = (connect_timeout, read_timeout)
+        limits = httpx.Limits(
+            max_connections=pool_maxsize if pool_block else None,
+            max_keepalive_connections=pool_maxsize,
+        )
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(verify=verify, limits=limits)
+            # httpx has no option to replace the pool class, count the connections like CGWHTTPAdapter
+            if type(transport._pool) is httpcore.AsyncConnectionPool:
+                transport._pool.__class__ = _CountingAsyncConnectionPool
+        self.transport = transport
+        self.session = httpx.AsyncClient(verify=verify, limits=limits, transport=transport)
+        self.session.headers["Content-type"] = "application/json"
+        self.session.headers["Accept"] = "application/json"
+
+    @property
+    def deadline(self):
+        """time.monotonic() value after which no request is sent, None for no deadline."""
+        return self.limiter.deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        """Set the deadline shared with the rate limiter, so that it doesn't wait past it."""
+        self.limiter.deadline = value
+
+    async def request(self, method, endpoint, data=None, **kwargs):
+        """HTTP request against CGW server API retried on connection errors and server errors.
+
+        Like urllib3, only the idempotent methods are retried on server errors
+        and on errors after the request was sent, failed connections are
+        retried for every method.
+
+        Args:
+            method (str)
+                HTTP method of the request
+            endpoint (str)
+                API specific endpoint for the request
+            data (str)
+                request body
+        Returns:
+            httpx.Response
+
+        Raises:
+            requests.exceptions.RetryError: When the retries of server errors are exhausted
+        """
+
+        retryable = method.upper() in Retry.DEFAULT_ALLOWED_METHODS
+        retry_number = 0
+        while True:
+            delay = self.limiter.cap(self.limiter.reserve())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            connect_timeout, read_timeout = deadline_timeout(self.timeout, self.deadline)
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+            retry_after = None
+            try:
+                response = await self.session.request(
+                    method, self._api_url(endpoint), content=data, timeout=timeout, **kwargs
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if retry_number >= self.retries:
+                    raise
+            except httpx.TransportError:
+                if not retryable or retry_number >= self.retries:
+                    raise
+            else:
+                if response.status_code in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self.limiter.on_throttle(retry_after)
+                else:
+                    self.limiter.on_success()
+                if not retryable or response.status_code not in RETRY_STATUSES:
+                    return response
+                if retry_number >= self.retries:
+                    raise requests.exceptions.RetryError(
+                        "Max retries exceeded with url: %s (too many %s error responses)"
+                        % (endpoint, response.status_code)
+                    )
+            retry_number += 1
+            if retry_after is None:
+                retry_after = backoff_time(retry_number, self.backoff_factor, self.jitter)
+            await asyncio.sleep(self.limiter.cap(min(retry_after, BACKOFF_MAX)))
+
+    async def get(self, endpoint, **kwargs):
+        """HTTP get request against CGW server API
+
+        Args:
+            endpoint (str)
+                API specific endpoint for the request
+        Returns:
+            httpx.Response
+        """
+
+        return await self.request("GET", endpoint, **kwargs)
+
+    async def post(self, endpoint, **kwargs):
+        """HTTP post request against CGW server API.
+
+        Args:
+            endpoint (str)
+                API specific endpoint for the request
+        Returns:
+            httpx.Response
+        """
+
+        return await self.request("POST", endpoint, **kwargs)
+
+    async def put(self, endpoint, **kwargs):
+        """HTTP put request against CGW server API.
+
+        Args:
+            endpoint (str)
+                API specific endpoint for the request
+        Returns:
+            httpx.Response
+        """
+
+        return await self.request("PUT", endpoint, **kwargs)
+
+    async def delete(self, endpoint, **kwargs):
+        """HTTP delete request against CGW server API.
+
+        Args:
+            endpoint (str)
+                API specific endpoint for the request
+        Returns:
+            httpx.Response
+        """
+
+        return await self.request("DELETE", endpoint, **kwargs)
+
+    def pool_stats(self):
+        """Statistics of the kept-alive connections.
+
+        Only the connections of the default transport are counted.
+
+        Returns:
+            dict: numbers of connections `opened`, `reused` for another request
+            and `discarded` because the pool was full
+        """
+
+        pool = getattr(self.transport, "_pool", None)
+        if not isinstance(pool, _AsyncCountingPoolMixin):
+            return {"opened": 0, "reused": 0, "discarded": 0}
+        return {
+            "opened": pool.num_connections,
+            "reused": max(0, pool.num_requests - pool.num_connections),
+            "discarded": pool.num_discarded,
+        }
+
+    async def close(self):
+        """Close the underlying connections."""
+
+        await self.session.aclose()
+
+    def _api_url(self, endpoint):
+        """Full URL of the API endpoint.
+
+        Args:
+            endpoint (str)
+                API specific endpoint for the request
+        Returns:
+            str
+        """
+
+        return "%s%s" % (self.hostname, endpoint)
@@ -0,0 +1,125 @@
+import logging
+import os
+import sqlite3
+import threading
+
+LOG = logging.getLogger("pubtools.cgw")
+
+CACHE_FILENAME = "checksums.sqlite"
+
+
+class ChecksumCache:
+    """On-disk cache of file checksums shared by the pushes using the same directory.
+
+    The checksums are stored in a sqlite database keyed by the real path,
+    size, modification time and inode of the file, so a changed file is
+    never served stale checksums. Only the latest checksums of a path are
+    kept.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize.
+
+        Args:
+            directory (str):
+                directory of the cache database, created when missing
+        """
+
+        self.directory = directory
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database on first use."""
+
+        if self._connection is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS checksums ("
+                    "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, md5 TEXT, sha256 TEXT)"
+                )
+        return self._connection
+
+    @staticmethod
+    def key(file_path):
+        """
+        Cache key of the file.
+
+        Args:
+            file_path (str):
+                path of the file
+
+        Returns (tuple|None):
+            Returns the real path, size, modification time in nanoseconds and
+            inode of the file or None when the file can't be accessed.
+        """
+
+        try:
+            real_path = os.path.realpath(file_path)
+            stat = os.stat(real_path)
+        except OSError:
+            return None
+        return (real_path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def get(self, key):
+        """
+        Get the cached checksums.
+
+        Args:
+            key (tuple|None):
+                cache key of the file
+
+        Returns (dict|None):
+            Returns md5 and sha256 hex digests and size of the file or None
+            when they aren't cached.
+        """
+
+        if key is None:
+            return None
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT md5, sha256 FROM checksums WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                    key,
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        LOG.debug("Using cached checksums of %s", key[0])
+        return {"md5": row[0], "sha256": row[1], "size": key[1]}
+
+    def put(self, key, checksums):
+        """
+        Store the checksums of the file.
+
+        Args:
+            key (tuple|None):
+                cache key of the file taken before the checksums were computed
+            checksums (dict):
+                md5 and sha256 hex digests of the file
+        """
+
+        if key is None:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO checksums (path, size, mtime_ns, inode, md5, sha256) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    key + (checksums["md5"], checksums["sha256"]),
+                )
+
+    def close(self):
+        """Close the database, it is opened again when needed."""
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,6 +1,14 @@
 from .cgw_client import CGWClient
+from .cgw_session import CONNECT_TIMEOUT, READ_TIMEOUT
 from .cgw_authentication import CGWBasicAuth
+from .scheduler import OperationScheduler, item_key, run_concurrently
+from .utils import validate_items
+import copy
+import itertools
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 LOG = logging.getLogger("pubtools.cgw")
 
@@ -17,22 +25,135 @@ class FetcherDict:
     from their mapping object
     """
 
-    def __init__(self, val=None, fetcher=None, key_checker=None):
+    def __init__(self, val=None, fetcher=None, key_checker=None, scope_size=None):
         """
         Initializing the FetcherDict
         The fetcher takes a fetch method as an argument and returns response.
         The key checker takes a mapping method as an argument and validate its keys.
 
+        A single fetcher call lists every record of a scope, e.g. all products,
+        all versions of a product or all files of a version. When ``scope_size``
+        is set, the first ``scope_size`` items of a key identify its scope and
+        every scope is fetched at most once; later misses in a fetched scope
+        are answered locally.
+
         Args:
             fetcher (method):
                 A fetch method instance
             key_checker (method):
                 A mapping method instance
+            scope_size (int|None):
+                Number of leading key items identifying the fetched scope
         """
 
         self.fetcher = fetcher
         self.key_checker = key_checker
         self.data = val or {}
+        self.scope_size = scope_size
+        self.fetched_scopes = set()
+        self.fetch_count = 0
+        self.fetches_avoided = 0
+        # concurrent misses of one scope wait for a single fetch
+        self._lock = threading.Lock()
+        self._scope_locks = {}
+
+    def _scope(self, key):
+        """
+        Returns the fetched scope the key belongs to
+
+        Args:
+            key (tuple):
+                Tuple key of a record
+
+        Returns:
+            scope (tuple|None):
+                Leading items of the key or None when scopes are not tracked.
+        """
+
+        if self.scope_size is None:
+            return None
+        return key[: self.scope_size]
+
+    def _fetch(self, key):
+        """
+        Run the fetcher for the key unless its scope was already fetched
+
+        Args:
+            key (tuple):
+                Tuple key to fetch
+        """
+
+        if key in self.data or not self.fetcher:
+            return
+        scope = self._scope(key)
+        with self._lock:
+            scope_lock = self._scope_locks.setdefault(scope, threading.Lock())
+
+        with scope_lock:
+            if key in self.data:
+                return
+            if scope is not None and scope in self.fetched_scopes:
+                with self._lock:
+                    self.fetches_avoided += 1
+                return
+            with self._lock:
+                self.fetch_count += 1
+            for new_key, vid in self.fetcher(*key):
+                self.data[new_key] = vid
+            if scope is not None:
+                self.fetched_scopes.add(scope)
+
+    def mark_fetched(self, scope):
+        """
+        Mark the scope as fully known so misses in it never reach the fetcher
+
+        Args:
+            scope (tuple):
+                Leading key items of the scope
+        """
+
+        if self.scope_size is not None:
+            self.fetched_scopes.add(scope)
+
+    def find_key(self, value, key):
+        """
+        Returns the key of the known record holding the value in the scope of the key
+
+        Args:
+            value (value):
+                Value of the record, e.g. its id
+            key (tuple):
+                Key of the same length in the scope to search
+
+        Returns:
+            key (tuple|None):
+                Returns the key of the record or None when it is not known.
+        """
+
+        scope = key[: self.scope_size or 0]
+        for existing_key, existing_value in list(self.data.items()):
+            if existing_value == value and len(existing_key) == len(key) and existing_key[: len(scope)] == scope:
+                return existing_key
+        return None
+
+    def move(self, old_prefix, new_prefix):
+        """
+        Move the records and the fetched scopes of keys starting with old_prefix to new_prefix
+
+        Args:
+            old_prefix (tuple):
+                Leading key items to replace
+            new_prefix (tuple):
+                Leading key items to replace them with
+        """
+
+        size = len(old_prefix)
+        with self._lock:
+            for key in [key for key in self.data if key[:size] == old_prefix]:
+                self.data[new_prefix + key[size:]] = self.data.pop(key)
+            for scope in [scope for scope in self.fetched_scopes if len(scope) >= size and scope[:size] == old_prefix]:
+                self.fetched_scopes.discard(scope)
+                self.fetched_scopes.add(new_prefix + scope[size:])
 
     def __setitem__(self, key, val):
         """
@@ -61,9 +182,7 @@ class FetcherDict:
         """
 
         self.key_checker(key)
-        if key not in self.data and self.fetcher:
-            for new_key, vid in self.fetcher(*key):
-                self.data[new_key] = vid
+        self._fetch(key)
         return self.data[key]
 
     def get(self, key, default=None):
@@ -79,9 +198,7 @@ class FetcherDict:
                 Returns the value of specified key.
         """
         self.key_checker(key)
-        if key not in self.data and self.fetcher:
-            for new_key, vid in self.fetcher(*key):
-                self.data[new_key] = vid
+        self._fetch(key)
         return self.data.get(key, default)
 
     def __delitem__(self, key):
@@ -96,6 +213,52 @@ class FetcherDict:
         self.data.__delitem__(key)
 
 
+class PrefetchScopes:
+    """Scopes of the CGW listings needed by linear CGW items, collected as the items are read."""
+
+    def __init__(self):
+        """Initialize without any items."""
+
+        self.product_keys = set()
+        # one full key per scope, it's enough to list the whole scope
+        self.version_scopes = {}
+        self.file_scopes = {}
+
+    def add(self, item):
+        """
+        Add the scopes needed by the item.
+
+        Args:
+            item (dict):
+                linear CGW item
+        """
+
+        key = item_key(item)
+        if key is None:
+            return
+        self.product_keys.add(key[:2])
+        if len(key) >= 3:
+            self.version_scopes.setdefault(key[:2], key[:3])
+        if len(key) == 4:
+            self.file_scopes.setdefault(key[:3], key)
+
+    def collect(self, items):
+        """
+        Add the scopes needed by the items as they are read.
+
+        Args:
+            items (iterable(dict)):
+                linear CGW items
+
+        Returns:
+            iterator(dict): Returns the items.
+        """
+
+        for item in items:
+            self.add(item)
+            yield item
+
+
 class PushBase:
     """Base class for all operations on content gateway via
     either through entry points or from staged input.
@@ -103,7 +266,23 @@ class PushBase:
     Adds arguments and environment variables common to all operations.
     """
 
-    def __init__(self, cgw_hostname, cgw_username, cgw_password):
+    def __init__(
+        self,
+        cgw_hostname,
+        cgw_username,
+        cgw_password,
+        workers=1,
+        pool_connections=10,
+        pool_maxsize=None,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+        deadline=None,
+        create_invisible=False,
+        validation_workers=1,
+        concurrency=None,
+    ):
         """
         Initialize.
 
@@ -114,21 +293,93 @@ class PushBase:
                 username for CGW HTTP API
             cgw_password (str):
                 password for CGW HTTP API
+            workers (int):
+                number of CGW operations allowed to run concurrently
+            pool_connections (int):
+                number of HTTP connection pools (hosts) to cache
+            pool_maxsize (int|None):
+                maximum number of HTTP connections kept alive per host,
+                by default at least one per concurrent CGW request
+            pool_block (bool):
+                wait for a free HTTP connection when all pooled connections are in use
+            connect_timeout (float|None):
+                seconds to wait for a connection to CGW
+            read_timeout (float|None):
+                seconds to wait for a CGW response
+            rate_limit (float|None):
+                maximum number of CGW requests per second, by default the
+                requests are limited only after CGW throttles them
+            deadline (float|None):
+                seconds the CGW operations of the push may take, see :meth:`start_deadline`
+            create_invisible (bool):
+                create versions and files invisible, their requested `invisible`
+                attribute is set by :meth:`make_visible`
+            validation_workers (int):
+                number of processes validating the CGW items
+            concurrency (int|None):
+                maximum number of CGW requests sent at the same time, `workers`
+                by default, subclasses running several pushes concurrently
+                set it to size the connection pool
         """
 
         self.auth = CGWBasicAuth(cgw_username, cgw_password)
-        self.cgw_client = CGWClient(cgw_hostname, self.auth)
-        self.product_mapping = FetcherDict({}, fetcher=self._fetch_product, key_checker=self._product_mapping_key_check)
+        self.cgw_client = CGWClient(
+            cgw_hostname,
+            self.auth,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize or max(10, concurrency or workers),
+            pool_block=pool_block,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            rate_limit=rate_limit,
+        )
+        # products are listed all at once, versions per product and files per version
+        self.product_mapping = FetcherDict(
+            {},
+            fetcher=self._fetch_product,
+            key_checker=self._product_mapping_key_check,
+            scope_size=0,
+        )
         self.pv_mapping = FetcherDict(
             {},
             fetcher=self._fetch_product_version,
             key_checker=self._product_version_mapping_key_check,
+            scope_size=2,
+        )
+        self.file_mapping = FetcherDict(
+            {},
+            fetcher=self._fetch_file,
+            key_checker=self._file_key_check,
+            scope_size=3,
         )
-        self.file_mapping = FetcherDict({}, fetcher=self._fetch_file, key_checker=self._file_key_check)
         self.product_records = {}
         self.version_records = {}
         self.file_records = {}
         self.completed_operations = []
+        self.rollback_report = []
+        self.workers = workers
+        self.deadline = deadline
+        self.create_invisible = create_invisible
+        self.validation_workers = validation_workers
+        self._deadline_at = None
+        self._operations_lock = threading.Lock()
+
+    def fork(self):
+        """
+        Copy sharing the CGW client and the catalog mappings with an operation log of its own.
+
+        Forks process independent items concurrently, every fork makes visible
+        and rolls back only the operations it carried out.
+
+        Returns:
+            PushBase: Returns the fork.
+        """
+
+        fork = copy.copy(self)
+        fork.completed_operations = []
+        fork.rollback_report = []
+        fork._operations_lock = threading.Lock()
+        return fork
 
     @staticmethod
     def _product_mapping_key_check(key):
@@ -280,6 +531,221 @@ class PushBase:
                 data["downloadURL"],
             ), data.get("id")
 
+    def _record_operation(self, item):
+        """
+        Keep a copy of data that has been used to create or update the cgw data.
+
+        Args:
+            item (dict):
+                Processed CGW item
+        """
+
+        with self._operations_lock:
+            self.completed_operations.append(item)
+
+    def _discard_operations(self, item_type, id_field, record_id):
+        """
+        Remove the operations of a deleted record from the completed operations.
+        This is to avoid the conflicts during the rollback and make_visible operations
+
+        Args:
+            item_type (str):
+                type of the deleted record
+            id_field (str):
+                item field holding the record id
+            record_id (int):
+                id of the deleted record
+        """
+
+        with self._operations_lock:
+            self.completed_operations[:] = [
+                record
+                for record in self.completed_operations
+                if not (record["type"] == item_type and record.get(id_field) == record_id)
+            ]
+
+    def validate_cgw_items(self, sources):
+        """
+        Validate the CGW items of all the sources, reporting all the invalid items at once.
+
+        Args:
+            sources (list(tuple)):
+                (source name, linear CGW items) pairs, the items may be an
+                iterator, they are validated as they are read on up to
+                `validation_workers` processes
+
+        Raises:
+            CGWError:
+                When any of the items is invalid
+        """
+
+        messages = []
+        counter = itertools.count()
+        for source, items in sources:
+            counted = (item for item, _ in zip(items, counter))
+            for error in validate_items(counted, workers=self.validation_workers):
+                message = "%s item %s (%s %s): %s" % (
+                    source,
+                    error["index"],
+                    error["type"],
+                    error["productCode"],
+                    error["error"],
+                )
+                LOG.error("Invalid CGW item %s", message)
+                messages.append(message)
+        count = next(counter)
+        if messages:
+            raise CGWError("%s out of %s CGW items are invalid:\n%s" % (len(messages), count, "\n".join(messages)))
+        LOG.info("Data validation successful for %s CGW items", count)
+
+    def process_items(self, items, process_file=None, prefetch=False):
+        """
+        Process the sorted linear CGW items.
+
+        Items run concurrently on up to `workers` threads. An item starts
+        only after all the preceding items of its parents or children finished,
+        so parents are still created before their children and children are
+        still deleted before their parents. Items read from an iterator are
+        processed as they are read, the first operations start before the
+        last items are read.
+
+        Args:
+            items (iterable(dict)):
+                Sorted linear CGW items
+            process_file (method):
+                Optional replacement of process_file for file items
+            prefetch (bool):
+                With more than one worker prefetch the mappings needed by the
+                items first, see :meth:`prefetch`, the items are read twice then
+
+        Raises:
+            Exception:
+                The first exception raised by the item operations
+        """
+
+        handlers = {
+            "product": self.process_product,
+            "product_version": self.process_version,
+            "file": process_file or self.process_file,
+        }
+
+        def process(item):
+            self.check_deadline()
+            handler = handlers.get(item.get("type"))
+            if handler is None:
+                return
+            try:
+                handler(item)
+            except Exception:
+                # a request cut short by the deadline is reported as the deadline error
+                self.check_deadline()
+                raise
+
+        if prefetch and self.workers > 1:
+            self.prefetch(items)
+        OperationScheduler(items, workers=self.workers).run(process)
+
+    def prefetch(self, items):
+        """
+        Fill the product, version and file mappings needed by the items before any write.
+
+        Args:
+            items (iterable(dict)):
+                Linear CGW items
+        """
+
+        scopes = PrefetchScopes()
+        for item in items:
+            scopes.add(item)
+        self.prefetch_scopes(scopes)
+
+    def prefetch_scopes(self, scopes):
+        """
+        Fill the product, version and file mappings of the collected scopes before any write.
+
+        The product list is fetched first, then the versions of all the existing
+        products the items refer to and finally the files of all the existing
+        versions, each level on up to `workers` threads. Records created by
+        the push don't exist yet, their listings are skipped.
+
+        Failed listings are only logged, they are fetched again when the items
+        are processed.
+
+        Args:
+            scopes (PrefetchScopes):
+                scopes needed by the items
+        """
+
+        if not scopes.product_keys:
+            return
+        LOG.debug(
+            "Prefetching CGW records of %s products and %s versions",
+            len(scopes.version_scopes),
+            len(scopes.file_scopes),
+        )
+        self._prefetch_mapping(self.product_mapping, [next(iter(scopes.product_keys))])
+        # only the already fetched data is checked, failed listings are not retried here
+        self._prefetch_mapping(
+            self.pv_mapping,
+            [key for scope, key in scopes.version_scopes.items() if self.product_mapping.data.get(scope)],
+        )
+        self._prefetch_mapping(
+            self.file_mapping,
+            [key for scope, key in scopes.file_scopes.items() if self.pv_mapping.data.get(scope)],
+        )
+
+    def _prefetch_mapping(self, mapping, keys):
+        """
+        Look up the keys concurrently so their scopes get fetched into the mapping.
+
+        Args:
+            mapping (FetcherDict):
+                mapping to fill
+            keys (list(tuple)):
+                one key of every scope to fetch
+        """
+
+        for key, error in run_concurrently(mapping.get, keys, workers=self.workers):
+            LOG.warning("Prefetching CGW records for %s failed: %s", key, getattr(error, "message", error))
+
+    def start_deadline(self):
+        """
+        Start counting the push deadline when it is set.
+
+        The CGW requests are not sent after the deadline and their timeouts
+        are shortened to the remaining time, so the push can't hang on a
+        stalled response. Operations started after the deadline fail with
+        CGWError and the push is rolled back.
+        """
+
+        if self.deadline is None:
+            return
+        self._deadline_at = time.monotonic() + self.deadline
+        self.cgw_client.set_deadline(self.deadline)
+
+    def clear_deadline(self):
+        """Remove the push deadline, e.g. before the rollback."""
+
+        self._deadline_at = None
+        self.cgw_client.set_deadline(None)
+
+    def check_deadline(self):
+        """
+        Check that the push deadline hasn't passed.
+
+        Raises:
+            CGWError:
+                When the deadline has passed
+        """
+
+        if self._deadline_at is not None and time.monotonic() >= self._deadline_at:
+            raise CGWError("CGW push deadline of %s seconds exceeded" % self.deadline)
+
+    def log_pool_stats(self):
+        """Log the statistics of the HTTP connections used for the push."""
+
+        LOG.info("CGW connection pool statistics: %s", self.cgw_client.pool_stats())
+
     def process_product(self, item):
         """
         Responsible for product workflow operations such as Create,
@@ -345,32 +811,35 @@ class PushBase:
             product_id = self.cgw_client.create_product(item.get("metadata"))
             # A new product is created so updating the existing product mapping
             self.product_mapping[(product_name, product_code)] = product_id
+            # a new product has no versions, so there is nothing to list for it
+            self.pv_mapping.mark_fetched((product_name, product_code))
             LOG.info("Created a new product with product_id:- %s\n" % product_id)
 
             # adding operational product_id for rollback operation
             item["product_id"] = product_id
             # keeping a copy of data that has been used to create the cgw data
-            self.completed_operations.append(item)
+            self._record_operation(item)
             return product_id
 
         elif item.get("action") == "update" and product_id:
             item.get("metadata")["id"] = product_id
             LOG.info("Updating product record of id:- %s \n", product_id)
             self.cgw_client.update_product(item.get("metadata"))
+            # the name or productCode may have changed
+            self._rename_record(
+                [self.product_mapping, self.pv_mapping, self.file_mapping], product_id, (product_name, product_code)
+            )
 
             # keeping a copy of data that has been used to update the cgw data
-            self.completed_operations.append(item)
+            self._record_operation(item)
 
         elif item.get("action") == "delete" and product_id:
             LOG.info("Deleting existing product records for product_id:- %s" % product_id)
             self.cgw_client.delete_product(product_id)
             del self.product_mapping[(product_name, product_code)]
 
-            #  removing the deleted file record from the completed operations
-            #  this is to avoid the conflicts during the rollback and make_visible operations
-            for record in self.completed_operations:
-                if record["type"] == "product" and record["product_id"] == product_id:
-                    self.completed_operations.remove(record)
+            #  removing the deleted record from the completed operations
+            self._discard_operations("product", "product_id", product_id)
 
             LOG.info("Product record deleted! \n")
         else:
@@ -453,34 +922,37 @@ class PushBase:
                 )
                 raise CGWError("Cannot create new version. Record already present.")
             LOG.info("Creating version entry for the given version_name: %s ", version_name)
-            version_id = self.cgw_client.create_version(product_id, item.get("metadata"))
+            version_id = self.cgw_client.create_version(product_id, self._created_metadata(item))
             # adding new version record to the version mapping
             self.pv_mapping[(product_name, product_code, version_name)] = version_id
+            # a new version has no files, so there is nothing to list for it
+            self.file_mapping.mark_fetched((product_name, product_code, version_name))
             LOG.info("New version created with version_id:- %s \n" % version_id)
 
             # adding operational version_id for rollback operation
             item["version_id"] = version_id
             # keeping a copy of data that has been used to create the cgw data
-            self.completed_operations.append(item)
+            self._record_operation(item)
             return
 
         if item.get("action") == "update" and version_id:
             item.get("metadata")["id"] = version_id
             LOG.info("Updating the version metadata \n")
             self.cgw_client.update_version(product_id, item.get("metadata"))
+            # the versionName may have changed
+            self._rename_record(
+                [self.pv_mapping, self.file_mapping], version_id, (product_name, product_code, version_name)
+            )
             # keeping a copy of data that has been used to update the cgw data
-            self.completed_operations.append(item)
+            self._record_operation(item)
 
         elif item.get("action") == "delete" and version_id:
             LOG.info("Deleting existing version records for version_id:- %s" % version_id)
             self.cgw_client.delete_version(product_id, version_id)
             del self.pv_mapping[(product_name, product_code, version_name)]
 
-            #  removing the deleted file record from the completed operations
-            #  this is to avoid the conflicts during the rollback and make_visible operations
-            for record in self.completed_operations:
-                if record["type"] == "product_version" and record["version_id"] == version_id:
-                    self.completed_operations.remove(record)
+            #  removing the deleted record from the completed operations
+            self._discard_operations("product_version", "version_id", version_id)
 
             LOG.info("Version record deleted! \n")
         else:
@@ -582,7 +1054,7 @@ class PushBase:
             file_metadata = file_item.get("metadata")
             if "pushItemPath" in file_metadata:
                 file_metadata.pop("pushItemPath")
-            file_id = self.cgw_client.create_file(product_id, version_id, file_metadata)
+            file_id = self.cgw_client.create_file(product_id, version_id, self._created_metadata(file_item))
             self.file_mapping[(product_name, product_code, version_name, download_url)] = file_id
             LOG.info("New file created with file_id:- %s \n" % file_id)
 
@@ -590,28 +1062,27 @@ class PushBase:
             file_item["product_id"] = product_id
             file_item["file_id"] = file_id
             # keeping a copy of data that has been used to create the cgw data
-            self.completed_operations.append(file_item)
+            self._record_operation(file_item)
             return
 
         if file_item.get("action") == "update" and file_id:
             LOG.info("Updating the file record \n")
             file_item.get("metadata")["id"] = file_id
             self.cgw_client.update_file(product_id, version_id, file_item.get("metadata"))
+            # the downloadURL may have changed
+            self._rename_record([self.file_mapping], file_id, (product_name, product_code, version_name, download_url))
 
             # adding operational product_id for rollback operation
             file_item["product_id"] = product_id
             # keeping a copy of data that has been used to update the cgw data
-            self.completed_operations.append(file_item)
+            self._record_operation(file_item)
 
         elif file_item.get("action") == "delete" and file_id:
             LOG.info("Deleting existing file records for file_id:- %s" % file_id)
             self.cgw_client.delete_file(product_id, version_id, file_id)
 
-            #  removing the deleted file record from the completed operations
-            #  this is to avoid the conflicts during the rollback and make_visible operations
-            for record in self.completed_operations:
-                if record["type"] == "file" and record["file_id"] == file_id:
-                    self.completed_operations.remove(record)
+            #  removing the deleted record from the completed operations
+            self._discard_operations("file", "file_id", file_id)
 
             LOG.info("File record deleted! \n")
             del self.file_mapping[(product_name, product_code, version_name, download_url)]
@@ -622,6 +1093,48 @@ class PushBase:
             )
         return file_id
 
+    @staticmethod
+    def _rename_record(mappings, record_id, key):
+        """
+        Key an updated record by its current name.
+
+        An update with the record id in the metadata may rename the record,
+        e.g. change the product name. The record and the records of its
+        children are moved to the new key with their fetched scopes, so the
+        following items find them by the new name.
+
+        Args:
+            mappings (list(FetcherDict)):
+                mapping of the record followed by the mappings of its children
+            record_id (int):
+                id of the updated record
+            key (tuple):
+                current key of the record
+        """
+
+        old_key = mappings[0].find_key(record_id, key)
+        if old_key is None:
+            mappings[0][key] = record_id
+        elif old_key != key:
+            for mapping in mappings:
+                mapping.move(old_key, key)
+
+    def _created_metadata(self, item):
+        """
+        Metadata sent to CGW to create the version or file.
+
+        Args:
+            item (dict):
+                version or file item
+
+        Returns:
+            dict: Returns the item metadata, an invisible copy of it with `create_invisible`.
+        """
+
+        if self.create_invisible:
+            return dict(item["metadata"], invisible=True)
+        return item["metadata"]
+
     def make_visible(self):
         """
 
@@ -635,28 +1148,85 @@ class PushBase:
             - `invisible=False` :- sets either if user externally specify the `invisible=False`
               or user doesn't specify any value for this `invisible` attribute.
 
+        - The files are updated first on up to `workers` threads, the versions
+          after all their files are done.
+        - Failures of all the updates are collected and raised as one CGWError.
+        - A passed push deadline is raised as CGWError instead.
+
+        Raises:
+            CGWError:
+                When any of the records cannot be updated
         """
 
         LOG.debug("Updating the invisible attribute of the created records")
         LOG.debug("Enabling the created records if required \n")
+        self.check_deadline()
+
+        with self._operations_lock:
+            created = [item for item in self.completed_operations if item.get("action") == "create"]
 
-        self.completed_operations.reverse()
-        for item in self.completed_operations:
-            if item.get("type") == "product_version":
-                if item.get("action") == "create":
-                    item["metadata"]["id"] = item["version_id"]
-                    item["metadata"]["invisible"] = False if not item["metadata"].get("invisible") else True
-                    self.cgw_client.update_version(item["metadata"]["productId"], item["metadata"])
-
-            elif item.get("type") == "file":
-                if item.get("action") == "create":
-                    item["metadata"]["id"] = item["file_id"]
-                    item["metadata"]["invisible"] = False if not item["metadata"].get("invisible") else True
-                    self.cgw_client.update_file(
-                        item["product_id"],
-                        item["metadata"]["productVersionId"],
-                        item["metadata"],
-                    )
+        self._run_visibility_updates(self._make_file_visible, [item for item in created if item.get("type") == "file"])
+        self._run_visibility_updates(
+            self._make_version_visible, [item for item in created if item.get("type") == "product_version"]
+        )
+
+    def _run_visibility_updates(self, update, items):
+        """
+        Run the visibility updates of the items concurrently.
+
+        Args:
+            update (method):
+                method updating a single item
+            items (list(dict)):
+                created CGW items
+
+        Raises:
+            CGWError:
+                When any of the updates fails
+        """
+
+        errors = run_concurrently(update, items, workers=self.workers)
+        if errors:
+            self.check_deadline()
+            messages = []
+            for item, error in errors:
+                message = "%s %s: %s" % (item["type"], item["metadata"].get("id"), getattr(error, "message", error))
+                LOG.error("Failed to update the invisible attribute of %s", message)
+                messages.append(message)
+            raise CGWError(
+                "Failed to update the invisible attribute of %s out of %s records:\n%s"
+                % (len(errors), len(items), "\n".join(messages))
+            )
+
+    def _make_version_visible(self, item):
+        """
+        Set the final invisible attribute of the created version.
+
+        Args:
+            item (dict):
+                created version item
+        """
+
+        item["metadata"]["id"] = item["version_id"]
+        item["metadata"]["invisible"] = False if not item["metadata"].get("invisible") else True
+        self.cgw_client.update_version(item["metadata"]["productId"], item["metadata"])
+
+    def _make_file_visible(self, item):
+        """
+        Set the final invisible attribute of the created file.
+
+        Args:
+            item (dict):
+                created file item
+        """
+
+        item["metadata"]["id"] = item["file_id"]
+        item["metadata"]["invisible"] = False if not item["metadata"].get("invisible") else True
+        self.cgw_client.update_file(
+            item["product_id"],
+            item["metadata"]["productVersionId"],
+            item["metadata"],
+        )
 
     def rollback_cgw_operation(self):
         """
@@ -665,51 +1235,133 @@ class PushBase:
             - For the create operations it will delete the created data from CGW
             - For the update operation it will revert the changes with old data.
 
+        Files are rolled back first, then versions and products last. Records of
+        one level are rolled back concurrently on up to `workers` threads, the
+        operations of a single record in the reverse order they were done in.
+        A failed step doesn't stop the remaining ones.
+
+        Returns:
+            list(dict): Returns the rollback report with one entry per operation
+            holding its `type`, `action`, record `id`, `status` ("done" or "failed")
+            and `error`. The report is kept in the `rollback_report` attribute too.
         """
 
-        self.completed_operations.reverse()
-        for item in self.completed_operations:
-            if item.get("type") == "product":
-                if item.get("action") == "create":
-                    self.cgw_client.delete_product(item["product_id"])
-                    LOG.info("Rollback done for created product:- %s", item["product_id"])
-
-                elif item.get("action") == "update":
-                    item["metadata"] = self.product_records.get(item["metadata"]["id"])
-                    self.cgw_client.update_product(item["metadata"])
-                    LOG.info("Rollback done for updated product:- %s", item["metadata"]["id"])
-
-            elif item.get("type") == "product_version":
-                if item.get("action") == "create":
-                    self.cgw_client.delete_version(item["metadata"]["productId"], item["version_id"])
-                    LOG.info(
-                        "Rollback done for created product_version:- %s",
-                        item["version_id"],
-                    )
-
-                elif item.get("action") == "update":
-                    item["metadata"] = self.version_records.get(item["metadata"]["id"])
-                    self.cgw_client.update_version(item["metadata"]["productId"], item["metadata"])
-                    LOG.info(
-                        "Rollback done for updated product_version:- %s",
-                        item["metadata"]["id"],
-                    )
-
-            elif item.get("type") == "file":
-                if item.get("action") == "create":
-                    self.cgw_client.delete_file(
-                        item["product_id"],
-                        item["metadata"]["productVersionId"],
-                        item["file_id"],
-                    )
-                    LOG.info("Rollback done for created file:- %s", item["file_id"])
-
-                elif item.get("action") == "update":
-                    item["metadata"] = self.file_records.get(item["metadata"]["id"])
-                    self.cgw_client.update_file(
-                        item["product_id"],
-                        item["metadata"]["productVersionId"],
-                        item["metadata"],
-                    )
-                    LOG.info("Rollback done for updated file:- %s", item["metadata"]["id"])
+        # the rollback must not be cut short by the push deadline
+        self.clear_deadline()
+        with self._operations_lock:
+            operations = list(reversed(self.completed_operations))
+
+        self.rollback_report = []
+        for item_type in ("file", "product_version", "product"):
+            records = {}
+            for item in operations:
+                if item.get("type") == item_type:
+                    records.setdefault(self._operation_record_id(item), []).append(item)
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+                for report in executor.map(self._rollback_record, records.values()):
+                    self.rollback_report.extend(report)
+
+        failed = [entry for entry in self.rollback_report if entry["status"] == "failed"]
+        if failed:
+            LOG.error("Rollback failed for %s out of %s operations", len(failed), len(self.rollback_report))
         LOG.info("Rollback operations completed...!")
+        return self.rollback_report
+
+    @staticmethod
+    def _operation_record_id(item):
+        """
+        Returns the id of the CGW record changed by the operation.
+
+        Args:
+            item (dict):
+                completed CGW item
+
+        Returns:
+            int: id of the product, version or file
+        """
+
+        id_field = {"product": "product_id", "product_version": "version_id", "file": "file_id"}[item["type"]]
+        return item.get(id_field) or (item.get("metadata") or {}).get("id")
+
+    def _rollback_record(self, items):
+        """
+        Undo the operations of a single record one by one.
+
+        Args:
+            items (list(dict)):
+                completed operations of the record in the reverse order
+
+        Returns:
+            list(dict): Returns the rollback report entries of the operations.
+        """
+
+        report = []
+        for item in items:
+            entry = {
+                "type": item.get("type"),
+                "action": item.get("action"),
+                "id": self._operation_record_id(item),
+                "status": "done",
+                "error": None,
+            }
+            try:
+                self._rollback_item(item)
+            except Exception as error:
+                entry["status"] = "failed"
+                entry["error"] = getattr(error, "message", str(error))
+                LOG.error("Rollback failed for %s %s %s: %s", entry["action"], entry["type"], entry["id"], error)
+            report.append(entry)
+        return report
+
+    def _rollback_item(self, item):
+        """
+        Undo a single completed CGW operation.
+
+        Args:
+            item (dict):
+                completed CGW item
+        """
+
+        if item.get("type") == "product":
+            if item.get("action") == "create":
+                self.cgw_client.delete_product(item["product_id"])
+                LOG.info("Rollback done for created product:- %s", item["product_id"])
+
+            elif item.get("action") == "update":
+                item["metadata"] = self.product_records.get(item["metadata"]["id"])
+                self.cgw_client.update_product(item["metadata"])
+                LOG.info("Rollback done for updated product:- %s", item["metadata"]["id"])
+
+        elif item.get("type") == "product_version":
+            if item.get("action") == "create":
+                self.cgw_client.delete_version(item["metadata"]["productId"], item["version_id"])
+                LOG.info(
+                    "Rollback done for created product_version:- %s",
+                    item["version_id"],
+                )
+
+            elif item.get("action") == "update":
+                item["metadata"] = self.version_records.get(item["metadata"]["id"])
+                self.cgw_client.update_version(item["metadata"]["productId"], item["metadata"])
+                LOG.info(
+                    "Rollback done for updated product_version:- %s",
+                    item["metadata"]["id"],
+                )
+
+        elif item.get("type") == "file":
+            if item.get("action") == "create":
+                self.cgw_client.delete_file(
+                    item["product_id"],
+                    item["metadata"]["productVersionId"],
+                    item["file_id"],
+                )
+                LOG.info("Rollback done for created file:- %s", item["file_id"])
+
+            elif item.get("action") == "update":
+                item["metadata"] = self.file_records.get(item["metadata"]["id"])
+                self.cgw_client.update_file(
+                    item["product_id"],
+                    item["metadata"]["productVersionId"],
+                    item["metadata"],
+                )
+                LOG.info("Rollback done for updated file:- %s", item["metadata"]["id"])
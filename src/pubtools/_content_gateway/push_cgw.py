@@ -1,8 +1,9 @@
 import argparse
 import logging
 import os
-from .push_base import PushBase
-from .utils import yaml_parser, validate_data, sort_items, format_cgw_items
+from .cgw_session import CONNECT_TIMEOUT, READ_TIMEOUT
+from .push_base import PrefetchScopes, PushBase
+from .utils import iter_collect_parents, iter_format_cgw_items, iter_sorted_items, yaml_items
 
 LOG = logging.getLogger("pubtools.cgw")
 LOG_FORMAT = "%(asctime)s [%(levelname)-8s] %(message)s"
@@ -11,7 +12,22 @@ LOG_FORMAT = "%(asctime)s [%(levelname)-8s] %(message)s"
 class PushCGW(PushBase):
     """Handle push CGW workflow."""
 
-    def __init__(self, cgw_hostname, cgw_username, cgw_password, cgw_filepath):
+    def __init__(
+        self,
+        cgw_hostname,
+        cgw_username,
+        cgw_password,
+        cgw_filepath,
+        workers=1,
+        pool_connections=10,
+        pool_maxsize=None,
+        pool_block=False,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        rate_limit=None,
+        deadline=None,
+        validation_workers=1,
+    ):
         """
         Initialize.
 
@@ -24,33 +40,81 @@ class PushCGW(PushBase):
                 password for CGW HTTP API
             cgw_filepath (str):
                 filepath of the yaml file
+            workers (int):
+                number of CGW operations allowed to run concurrently
+            pool_connections (int):
+                number of HTTP connection pools (hosts) to cache
+            pool_maxsize (int|None):
+                maximum number of HTTP connections kept alive per host
+            pool_block (bool):
+                wait for a free HTTP connection when all pooled connections are in use
+            connect_timeout (float|None):
+                seconds to wait for a connection to CGW
+            read_timeout (float|None):
+                seconds to wait for a CGW response
+            rate_limit (float|None):
+                maximum number of CGW requests per second, by default the
+                requests are limited only after CGW throttles them
+            deadline (float|None):
+                seconds the CGW operations may take before the push is rolled back
+            validation_workers (int):
+                number of processes validating the CGW items
         """
 
-        PushBase.__init__(self, cgw_hostname, cgw_username, cgw_password)
+        PushBase.__init__(
+            self,
+            cgw_hostname,
+            cgw_username,
+            cgw_password,
+            workers=workers,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            rate_limit=rate_limit,
+            deadline=deadline,
+            validation_workers=validation_workers,
+        )
         self.cgw_filepath = cgw_filepath
         self.cgw_items = []
 
+    def read_cgw_items(self):
+        """
+        Read the linear CGW items of the yaml file one by one.
+
+        Returns:
+            iterator(dict): Returns the linear CGW items as they are parsed.
+        """
+
+        return iter_format_cgw_items(yaml_items(self.cgw_filepath))
+
     def cgw_operations(self):
         """
         Initiate the CGW operations such as create, update or delete
         on products, versions and files.
-        """
 
-        self.cgw_items = yaml_parser(self.cgw_filepath)
-        self.cgw_items = format_cgw_items(self.cgw_items)
+        All the invalid items are reported at once, see :meth:`validate_cgw_items`.
+        The yaml file is streamed, the items are validated in a first pass,
+        so nothing is written for an invalid file, then parsed again and
+        processed as soon as they are sorted, see :func:`utils.iter_sorted_items`.
+        The first pass collects the products and versions the file creates or
+        updates, the items of the other ones don't wait for their parents.
+        With more than one worker the mappings needed by the items, collected
+        in the first pass, are prefetched before the first write.
+        """
 
-        for item in self.cgw_items:
-            validate_data(item)
-        self.cgw_items = sort_items(self.cgw_items)
+        scopes = PrefetchScopes()
+        parents = set()
+        self.validate_cgw_items(
+            [(self.cgw_filepath, scopes.collect(iter_collect_parents(self.read_cgw_items(), parents)))]
+        )
+        self.cgw_items = iter_sorted_items(self.read_cgw_items(), parents)
+        self.start_deadline()
         try:
-            for item in self.cgw_items:
-                if item["type"] == "product":
-                    self.process_product(item)
-                elif item["type"] == "product_version":
-                    self.process_version(item)
-                elif item["type"] == "file":
-                    self.process_file(item)
-
+            if self.workers > 1:
+                self.prefetch_scopes(scopes)
+            self.process_items(self.cgw_items)
             self.make_visible()
             LOG.info("\n All CGW operations are successfully completed...!")
         except Exception as error:
@@ -61,6 +125,8 @@ class PushCGW(PushBase):
             #  raising the occurred Exception as all the exception will get caught in this except block
             #  we want to return full Traceback
             raise error
+        finally:
+            self.log_pool_stats()
 
 
 def main():
@@ -82,6 +148,65 @@ def main():
     parser.add_argument(
         "-f", "--CGW_filepath", required=True, metavar="CGW-filepath", help="File path to read metadata"
     )
+    parser.add_argument(
+        "-w",
+        "--CGW_workers",
+        type=int,
+        default=1,
+        metavar="CGW-workers",
+        help="Number of CGW operations to run concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--CGW_pool_connections",
+        type=int,
+        default=10,
+        metavar="CGW-pool-connections",
+        help="Number of HTTP connection pools to cache (default: 10)",
+    )
+    parser.add_argument(
+        "--CGW_pool_maxsize",
+        type=int,
+        metavar="CGW-pool-maxsize",
+        help="Maximum number of HTTP connections kept alive (default: 10 or number of workers if higher)",
+    )
+    parser.add_argument(
+        "--CGW_pool_block",
+        action="store_true",
+        help="Wait for a free HTTP connection instead of opening an extra one when the pool is full",
+    )
+    parser.add_argument(
+        "--CGW_connect_timeout",
+        type=float,
+        default=CONNECT_TIMEOUT,
+        metavar="CGW-connect-timeout",
+        help="Seconds to wait for a connection to CGW (default: %s)" % CONNECT_TIMEOUT,
+    )
+    parser.add_argument(
+        "--CGW_read_timeout",
+        type=float,
+        default=READ_TIMEOUT,
+        metavar="CGW-read-timeout",
+        help="Seconds to wait for a CGW response (default: %s)" % READ_TIMEOUT,
+    )
+    parser.add_argument(
+        "--CGW_rate_limit",
+        type=float,
+        metavar="CGW-rate-limit",
+        help="Maximum number of CGW requests per second (default: limited only once CGW throttles them)",
+    )
+    parser.add_argument(
+        "--CGW_deadline",
+        type=float,
+        metavar="CGW-deadline",
+        help="Seconds the CGW operations may take before the push is rolled back (default: no limit)",
+    )
+    parser.add_argument(
+        "--CGW_validation_workers",
+        type=int,
+        default=1,
+        metavar="CGW-validation-workers",
+        help="Number of processes validating the CGW items (default: 1)",
+    )
     args = parser.parse_args()
 
     # Check if password is provided as an argument or through an environment variable
@@ -91,5 +216,19 @@ def main():
     if not cgw_password:
         parser.error("CGW password must be provided as an argument or set as the 'CGW_PASSWORD' environment variable.")
 
-    push_cgw = PushCGW(args.CGW_hostname, args.CGW_username, cgw_password, args.CGW_filepath)
+    push_cgw = PushCGW(
+        args.CGW_hostname,
+        args.CGW_username,
+        cgw_password,
+        args.CGW_filepath,
+        workers=args.CGW_workers,
+        pool_connections=args.CGW_pool_connections,
+        pool_maxsize=args.CGW_pool_maxsize,
+        pool_block=args.CGW_pool_block,
+        connect_timeout=args.CGW_connect_timeout,
+        read_timeout=args.CGW_read_timeout,
+        rate_limit=args.CGW_rate_limit,
+        deadline=args.CGW_deadline,
+        validation_workers=args.CGW_validation_workers,
+    )
     push_cgw.cgw_operations()
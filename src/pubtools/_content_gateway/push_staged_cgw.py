@@ -1,9 +1,20 @@
+import functools
 import os
-import json
 import logging
-import hashlib
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from .cgw_session import CONNECT_TIMEOUT, READ_TIMEOUT
+from .checksum_cache import ChecksumCache
 from .push_base import PushBase
-from .utils import yaml_parser, validate_data, sort_items, format_cgw_items
+from .scheduler import build_dependencies, group_related, item_key, run_concurrently
+from .utils import (
+    file_checksums,
+    iter_collect_parents,
+    iter_format_cgw_items,
+    iter_sorted_items,
+    process_context,
+    yaml_items,
+)
 
 try:
     import attr as attrs
@@ -18,6 +29,248 @@ LOG = logging.getLogger("pubtools.cgw")
 LOG_FORMAT = "%(asctime)s [%(levelname)-8s] %(message)s"
 
 
+def completed_future(result):
+    """Future already holding the result."""
+
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+@attrs.frozen
+class PushItemEntry:
+    """Data of a non-CGW push item needed to resolve the `pushItemPath` of file items."""
+
+    # position of the push item in the sources
+    position = attrs.field()
+    # push_item_key of the push item
+    key = attrs.field()
+    directory = attrs.field()
+
+    @property
+    def name(self):
+        """Name of the push item."""
+        return self.key[0]
+
+    @property
+    def src(self):
+        """Source path of the push item."""
+        return self.key[1]
+
+
+@attrs.frozen
+class PulpUnitRecord:
+    """Data of a push item published by Pulp needed for its CGW file record."""
+
+    cdn_path = attrs.field()
+    sha256sum = attrs.field()
+    md5sum = attrs.field()
+
+
+@attrs.define
+class OverlapState:
+    """State of the overlapped mode, see :meth:`PushStagedCGW.start_overlapped_operations`."""
+
+    # fork processing every CGW push item
+    forks = attrs.field()
+    # items which need Pulp or depend on such items of every CGW push item
+    deferred = attrs.field()
+    # processes the items which don't need Pulp
+    executor = attrs.field()
+    # processes the files of the published push items
+    file_executor = attrs.field()
+    # future of the items which don't need Pulp of every CGW push item
+    early = attrs.field()
+    # futures of the files of the published push items of every CGW push item
+    files = attrs.field()
+    # indexes of the CGW push items processed one after another, see group_related
+    groups = attrs.field()
+    # ids of the deferred items already submitted to the file executor
+    submitted = attrs.field(factory=set)
+    # push_item_key -> [(CGW push item index, file item)] waiting for the push item
+    waiting = attrs.field(factory=dict)
+
+    def process_early_items(self, group, early_items):
+        """
+        Process the items which don't need Pulp of the CGW push items in the group one after another.
+
+        Args:
+            group (list(int)):
+                indexes of the CGW push items
+            early_items (list(list(dict))):
+                items which don't need Pulp of every CGW push item
+
+        Raises:
+            Exception:
+                The first exception, the following CGW push items are not started then
+        """
+
+        for index in group:
+            fork = self.forks[index]
+            fork.process_items(early_items[index], process_file=fork.process_staged_file, prefetch=True)
+
+    def submit_file(self, index, item):
+        """
+        Start processing the file item of a published push item.
+
+        Args:
+            index (int):
+                index of the CGW push item
+            item (dict):
+                file item
+        """
+
+        self.submitted.add(id(item))
+        self.files[index].append(self.file_executor.submit(self.process_waiting_file, index, item))
+
+    def process_waiting_file(self, index, item):
+        """
+        Process the file item of the published push item after the items it depends on.
+
+        Args:
+            index (int):
+                index of the CGW push item
+            item (dict):
+                file item
+        """
+
+        # a failure of the preceding items is reported by push_staged_operations
+        if self.early[index].exception() is not None:
+            return
+        fork = self.forks[index]
+        fork.process_items([item], process_file=fork.process_staged_file)
+
+    def waiter(self, index):
+        """
+        Callable waiting for the operations of a CGW push item started during the Pulp push.
+
+        Args:
+            index (int):
+                index of the CGW push item
+
+        Returns (method):
+            Returns the callable raising the first exception of the operations.
+        """
+
+        def wait():
+            self.early[index].result()
+            for future in self.files[index]:
+                future.result()
+
+        return wait
+
+    def shutdown(self, cancel=False):
+        """
+        Shut down the executors once their running operations finish.
+
+        Args:
+            cancel (bool):
+                cancel the operations which haven't started yet
+        """
+
+        self.executor.shutdown(cancel_futures=cancel)
+        self.file_executor.shutdown(cancel_futures=cancel)
+
+
+def push_item_key(item):
+    """
+    Identity of the push item which stays the same when Pulp fills its checksums.
+
+    Args:
+        item (PushItem):
+            push item
+
+    Returns (tuple):
+        Returns the name, src, dest, origin, build and signing key of the item.
+    """
+
+    return (item.name, item.src, tuple(item.dest), item.origin, item.build, item.signing_key)
+
+
+class PushItemIndex:
+    """Push items loaded from the sources needed by the CGW operations.
+
+    CGW push items are kept whole. The other push items are only indexed by
+    their path relative to the origin, the index keeps a compact
+    :class:`PushItemEntry` instead of the push item, so the memory used
+    doesn't grow with the size of the push items.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+
+        # CGW push items in the order of the sources
+        self.cgw_push_items = []
+        # number of push items loaded from the sources
+        self.count = 0
+        # relative path -> PushItemEntry of the first push item with the path
+        self.paths = {}
+        # PushItemEntry of the first DirectoryPushItem
+        self.directory = None
+
+    def add(self, item):
+        """
+        Add the push item loaded from a source.
+
+        Args:
+            item (PushItem):
+                push item loaded from the source
+        """
+
+        position = self.count
+        self.count += 1
+        if isinstance(item, CGWPushItem):
+            self.cgw_push_items.append(item)
+        elif isinstance(item, DirectoryPushItem):
+            if self.directory is None:
+                self.directory = PushItemEntry(position, push_item_key(item), True)
+        elif item.src is not None:
+            path = item.src.replace(item.origin or "", "").lstrip("/")
+            self.paths.setdefault(path, PushItemEntry(position, push_item_key(item), False))
+
+    def merge(self, other):
+        """
+        Add the push items of the other index as if they were loaded after the ones of this index.
+
+        Args:
+            other (PushItemIndex):
+                index of the push items loaded later
+        """
+
+        offset = self.count
+
+        def shifted(entry):
+            return attrs.evolve(entry, position=entry.position + offset)
+
+        self.cgw_push_items.extend(other.cgw_push_items)
+        self.count += other.count
+        if self.directory is None and other.directory is not None:
+            self.directory = shifted(other.directory)
+        for path, entry in other.paths.items():
+            if path not in self.paths:
+                self.paths[path] = shifted(entry)
+
+    def find(self, path):
+        """
+        Find the push item providing the file with the given path.
+
+        The first push item matching the path is returned unless a
+        DirectoryPushItem precedes it, then the directory is returned.
+
+        Args:
+            path (str):
+                pushItemPath of the file item
+
+        Returns (PushItemEntry|None):
+            Returns the index entry of the push item or None when no push item matches.
+        """
+
+        candidates = [entry for entry in (self.paths.get(path), self.directory) if entry]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda entry: entry.position)
+
+
 class PushStagedCGW(PushBase):
     """Handle push staged CGW workflow."""
 
@@ -29,37 +282,143 @@ class PushStagedCGW(PushBase):
             target_name (str):
                 Name of the target.
             target_settings (dict):
-                Target settings.
+                Target settings. The optional `workers` setting is the
+                number of CGW operations allowed to run concurrently,
+                `pool_connections`, `pool_maxsize` and `pool_block`
+                configure the HTTP connection pool, `connect_timeout`
+                and `read_timeout` the CGW request timeouts, `rate_limit`
+                the maximum number of CGW requests per second and `deadline`
+                the seconds the CGW operations may take. `checksum_workers`
+                is the number of processes computing the checksums of directory
+                push item files, the number of CPUs by default, and
+                `checksum_cache_dir` the directory of the checksum cache
+                reused by the following pushes.
+                `item_workers` is the number of CGW push items processed
+                concurrently, the `workers` setting by default. With the
+                `overlapped` setting the CGW operations which don't need Pulp
+                start right after the sources are loaded, see
+                :meth:`start_overlapped_operations`. `validation_workers`
+                is the number of processes validating the CGW items.
+                The connection pool keeps a connection for every CGW request
+                which may run concurrently unless `pool_maxsize` is set.
         """
+        workers = target_settings.get("workers", 1)
+        item_workers = target_settings.get("item_workers", workers)
+        overlapped = target_settings.get("overlapped", False)
         PushBase.__init__(
             self,
             target_settings["target_address"],
             target_settings["target_user"],
             target_settings["target_password"],
+            workers=workers,
+            pool_connections=target_settings.get("pool_connections", 10),
+            pool_maxsize=target_settings.get("pool_maxsize"),
+            pool_block=target_settings.get("pool_block", False),
+            connect_timeout=target_settings.get("connect_timeout", CONNECT_TIMEOUT),
+            read_timeout=target_settings.get("read_timeout", READ_TIMEOUT),
+            rate_limit=target_settings.get("rate_limit"),
+            deadline=target_settings.get("deadline"),
+            create_invisible=overlapped,
+            validation_workers=target_settings.get("validation_workers", 1),
+            concurrency=self.concurrency(workers, item_workers, overlapped),
         )
-        self.push_items = []
+        self.push_item_index = PushItemIndex()
+        self.item_workers = item_workers
+        # completed operations of every CGW push item
+        self.cgw_item_operations = []
+        # push item key -> PulpUnitRecord
         self.pulp_push_units = {}
-        self.processed_push_items = {}
+        self.checksum_workers = target_settings.get("checksum_workers")
+        checksum_cache_dir = target_settings.get("checksum_cache_dir")
+        self.checksum_cache = ChecksumCache(checksum_cache_dir) if checksum_cache_dir else None
+        # directory file path -> future of its checksums
+        self._checksums = {}
+        self._checksum_executor = None
+        self.overlapped = overlapped
+        # state of the overlapped mode, see start_overlapped_operations
+        self._overlap = None
+        self._overlap_lock = threading.Lock()
         self.source_urls = source_urls
+        self.load_sources(source_urls)
 
-        for source_url in source_urls:
-            with Source.get(source_url) as source:
-                LOG.info("Loading items from %s", source_url)
-                for item in source:
-                    self.push_items.append(item)
+    @staticmethod
+    def load_source(source_url):
+        """
+        Load the push items of one source into a new index.
+
+        Args:
+            source_url (str):
+                URL of the pushsource source
+
+        Returns (PushItemIndex):
+            Returns the index of the push items of the source.
+        """
+
+        index = PushItemIndex()
+        with Source.get(source_url) as source:
+            LOG.info("Loading items from %s", source_url)
+            for item in source:
+                index.add(item)
+        return index
 
     @staticmethod
-    def push_item_str(item):
-        push_item_dict = attrs.asdict(item)
-        item_json = {
-            "name": push_item_dict["name"],
-            "src": push_item_dict["src"],
-            "dest": push_item_dict["dest"],
-            "origin": push_item_dict["origin"],
-            "build": push_item_dict["build"],
-            "signing_key": push_item_dict["signing_key"],
-        }
-        return json.dumps(item_json, sort_keys=True)
+    def concurrency(workers, item_workers, overlapped):
+        """
+        Maximum number of CGW requests the push sends at the same time.
+
+        Up to `item_workers` CGW push items are processed at once, each
+        of them on up to `workers` threads. In the overlapped mode the files
+        waiting for Pulp are processed on another `workers` threads.
+
+        Args:
+            workers (int):
+                number of CGW operations of a push item running concurrently
+            item_workers (int):
+                number of CGW push items processed concurrently
+            overlapped (bool):
+                whether the overlapped mode is enabled
+
+        Returns:
+            int: Returns the number of concurrent requests.
+        """
+
+        workers, item_workers = max(1, workers), max(1, item_workers)
+        return workers * item_workers + (workers if overlapped else 0)
+
+    def load_sources(self, source_urls):
+        """
+        Load the push items of the sources concurrently.
+
+        Every source is loaded into its own index on a separate thread, the
+        indexes are merged in the order of the sources, so the result is
+        the same as if the sources were loaded one after another.
+
+        Args:
+            source_urls (list(str)):
+                URLs of the pushsource sources
+        """
+
+        if len(source_urls) <= 1:
+            indexes = [self.load_source(source_url) for source_url in source_urls]
+        else:
+            with ThreadPoolExecutor(max_workers=len(source_urls)) as executor:
+                indexes = list(executor.map(self.load_source, source_urls))
+        for index in indexes:
+            self.push_item_index.merge(index)
+
+    def find_push_item(self, path):
+        """
+        Find the push item providing the file with the given path.
+
+        Args:
+            path (str):
+                pushItemPath of the file item
+
+        Returns (PushItemEntry|None):
+            Returns the index entry of the push item or None when no push item matches.
+        """
+
+        return self.push_item_index.find(path)
 
     @hookimpl
     def pulp_item_push_finished(self, pulp_units, push_item):
@@ -80,84 +439,522 @@ class PushStagedCGW(PushBase):
         """
 
         if pulp_units:
-            self.pulp_push_units[self.push_item_str(push_item)] = pulp_units[0]
-            self.processed_push_items[self.push_item_str(push_item)] = push_item
+            self.pulp_push_units[push_item_key(push_item)] = PulpUnitRecord(
+                cdn_path=pulp_units[0].cdn_path,
+                sha256sum=pulp_units[0].sha256sum,
+                md5sum=push_item.md5sum,
+            )
+            self._submit_waiting_files(push_item_key(push_item))
+
+    def directory_files(self, items):
+        """
+        Paths of the directory push item files the file items refer to.
+
+        Args:
+            items (list(dict)):
+                linear CGW items
+
+        Returns (list(str)):
+            Returns the paths without duplicates in the order of the items.
+        """
+
+        paths = {}
+        for pitem in items:
+            push_item_path = (pitem.get("metadata") or {}).get("pushItemPath")
+            if pitem.get("type") != "file" or push_item_path is None:
+                continue
+            push_item = self.find_push_item(push_item_path)
+            if push_item is not None and push_item.directory:
+                paths[os.path.join(push_item.src, push_item_path.split("/")[-1])] = None
+        return list(paths)
+
+    def start_checksums(self, items):
+        """
+        Start computing the checksums of the directory files the items refer to.
+
+        The checksums are computed on a process pool while the CGW operations
+        run, :meth:`process_staged_file` waits for them.
+
+        Args:
+            items (list(dict)):
+                linear CGW items
+        """
+
+        for path in self.directory_files(items):
+            if path not in self._checksums:
+                self._checksums[path] = self._file_checksums_future(path, use_pool=True)
+
+    def _file_checksums_future(self, path, use_pool):
+        """
+        Get the checksums of the file from the checksum cache or compute them.
+
+        The computed checksums are added to the cache.
+
+        Args:
+            path (str):
+                path of the file
+            use_pool (bool):
+                compute the checksums on the process pool instead of right away
+
+        Returns (Future):
+            Returns the future of md5 and sha256 hex digests and size of the file.
+        """
+
+        key, checksums = self._cached_checksums(path)
+        if checksums is not None:
+            return completed_future(checksums)
+
+        if not use_pool:
+            future = completed_future(file_checksums(path))
+        else:
+            if self._checksum_executor is None:
+                self._checksum_executor = ProcessPoolExecutor(
+                    max_workers=self.checksum_workers, mp_context=process_context()
+                )
+            future = self._checksum_executor.submit(file_checksums, path)
+        if self.checksum_cache is not None:
+            future.add_done_callback(functools.partial(self._cache_checksums, key))
+        return future
+
+    def _cache_checksums(self, key, future):
+        """
+        Store the computed checksums in the checksum cache.
+
+        Args:
+            key (tuple|None):
+                cache key of the file
+            future (Future):
+                finished checksum computation
+        """
+
+        if not future.cancelled() and future.exception() is None:
+            self.checksum_cache.put(key, future.result())
+
+    def _cached_checksums(self, path):
+        """
+        Look the file up in the checksum cache.
+
+        Args:
+            path (str):
+                path of the file
+
+        Returns (tuple):
+            Returns the cache key and the cached checksums or None for each of them
+            when the cache isn't used or doesn't hold the checksums.
+        """
+
+        if self.checksum_cache is None:
+            return None, None
+        key = self.checksum_cache.key(path)
+        return key, self.checksum_cache.get(key)
+
+    def directory_file_checksums(self, path):
+        """
+        Checksums of the directory file, computed when they weren't started before.
+
+        Args:
+            path (str):
+                path of the file
+
+        Returns (dict):
+            Returns md5 and sha256 hex digests and size of the file.
+        """
+
+        if path not in self._checksums:
+            self._checksums[path] = self._file_checksums_future(path, use_pool=False)
+        return self._checksums[path].result()
+
+    def stop_checksums(self):
+        """Cancel the pending checksum computations, stop the process pool and close the cache."""
+
+        if self._checksum_executor is not None:
+            self._checksum_executor.shutdown(cancel_futures=True)
+            self._checksum_executor = None
+        self._checksums = {}
+        if self.checksum_cache is not None:
+            self.checksum_cache.close()
+
+    def process_staged_file(self, pitem):
+        """
+        Resolve the push item referenced by the file item and carry out its CGW operation.
+
+        Files with `pushItemPath` get their downloadURL, checksums and size
+        from the matching push item before being processed.
+
+        Args:
+            pitem (dict):
+                Metadata of file record
+
+        Raises:
+            ValueError:
+                When no push item matches the `pushItemPath`
+        """
+
+        if "pushItemPath" in pitem["metadata"]:
+            # push to CDN and set required pitem attributes for CGW entry
+            push_item = self.find_push_item(pitem["metadata"]["pushItemPath"])
+            if push_item is None:
+                raise ValueError("Unable to find push item with path:%s" % pitem["metadata"]["pushItemPath"])
+            if not push_item.directory:
+                pulp_push_unit = self.pulp_push_units[push_item.key]
+                pitem["metadata"]["downloadURL"] = pulp_push_unit.cdn_path
+                pitem["metadata"]["md5"] = pulp_push_unit.md5sum
+                pitem["metadata"]["sha256"] = pulp_push_unit.sha256sum
+                pitem["metadata"]["size"] = os.stat(push_item.src).st_size
+            else:
+                filename = pitem["metadata"]["pushItemPath"].split("/")[-1]
+                pitem["metadata"].update(self.directory_file_checksums(os.path.join(push_item.src, filename)))
+                pitem["metadata"]["downloadURL"] = "/content/origin/files/sha256/{0}/{1}/{2}".format(
+                    pitem["metadata"]["sha256"][:2],
+                    pitem["metadata"]["sha256"],
+                    filename,
+                )
+        # carry out CGW operations
+        self.process_file(pitem)
+
+    def parse_cgw_push_items(self):
+        """
+        Parse and validate the items of all the CGW push items.
+
+        The invalid items of all the CGW push items are reported at once,
+        see :meth:`validate_cgw_items`. Every yaml file is parsed once, the
+        items are validated while the products and versions they create or
+        update are collected, so the items of the other products and versions
+        are sorted without waiting for their parents.
+
+        Returns (list(list(dict))):
+            Returns the sorted linear CGW items of every CGW push item.
+        """
+
+        sources = [
+            (item.src, list(iter_format_cgw_items(yaml_items(os.path.join(item.origin, item.src)))))
+            for item in self.push_item_index.cgw_push_items
+        ]
+        parents = [set() for _ in sources]
+        self.validate_cgw_items(
+            [(src, iter_collect_parents(items, item_parents)) for (src, items), item_parents in zip(sources, parents)]
+        )
+        return [list(iter_sorted_items(items, item_parents)) for (_, items), item_parents in zip(sources, parents)]
 
     def push_staged_operations(self):
         """
         Initiate the CGW operations for push staged.
         Operations such as create, update or delete
         on products, versions and files would be performed.
+
+        All the CGW push items are parsed and validated first. CGW push items
+        which don't touch the same products are then processed concurrently
+        on up to `item_workers` threads, see :meth:`process_cgw_push_items`.
+        In the overlapped mode only the operations which haven't run during
+        the Pulp push are carried out here.
+        """
+
+        try:
+            if self.overlapped and self._overlap is None:
+                self.start_overlapped_operations()
+            if self._overlap is not None:
+                self.finish_overlapped_operations()
+            else:
+                self.start_deadline()
+                cgw_items = self.parse_cgw_push_items()
+                for parsed_items in cgw_items:
+                    self.start_checksums(parsed_items)
+                self.process_cgw_push_items(cgw_items)
+        finally:
+            self.stop_checksums()
+        self.log_pool_stats()
+
+    def process_cgw_push_items(self, cgw_items, forks=None, waits=None, groups=None):
         """
+        Process the items of the CGW push items, independent CGW push items concurrently.
+
+        CGW push items touching the same product are processed one after another
+        in their order, the other ones on up to `item_workers` threads. Every
+        CGW push item runs on a :meth:`fork` sharing the catalog mappings and
+        keeping its own operation log, so a failed CGW push item rolls back
+        only its own operations. No CGW push item is started after a failure.
 
-        for item in self.push_items:
-            if isinstance(item, CGWPushItem):
-                parsed_items = yaml_parser(os.path.join(item.origin, item.src))
-                parsed_items = format_cgw_items(parsed_items)
+        Args:
+            cgw_items (list(list(dict))):
+                sorted linear CGW items of every CGW push item
+            forks (list(PushStagedCGW)|None):
+                forks which already started the CGW push items, new forks by default
+            waits (list(method)|None):
+                callables waiting for the operations the forks already started,
+                see :meth:`process_cgw_items`
+            groups (list(list(int))|None):
+                indexes of the CGW push items processed one after another,
+                grouped by the products the items touch by default
 
-                for pitem in parsed_items:
-                    validate_data(pitem)
+        Raises:
+            Exception:
+                The first exception raised by the CGW push items
+        """
 
-                parsed_items = sort_items(parsed_items)
+        forks = forks or [self.fork() for _ in cgw_items]
+        waits = waits or [None for _ in cgw_items]
+        self.cgw_item_operations = [fork.completed_operations for fork in forks]
+        failed = threading.Event()
+
+        def process_group(group):
+            for index in group:
+                if failed.is_set():
+                    forks[index].discard_cgw_items(waits[index])
+                    continue
                 try:
-                    for pitem in parsed_items:
-                        if pitem["type"] == "product":
-                            self.process_product(pitem)
-                        if pitem.get("type") == "product_version":
-                            self.process_version(pitem)
-                        if pitem["type"] == "file":
-                            if "pushItemPath" in pitem["metadata"]:
-                                # push to CDN and set required pitem attributes for CGW entry
-                                found = None
-                                for push_item in self.push_items:
-                                    if isinstance(push_item, DirectoryPushItem):
-                                        found = "directory_item"
-                                    elif (
-                                        push_item.src.replace(push_item.origin, "").lstrip("/")
-                                        == pitem["metadata"]["pushItemPath"]
-                                    ):
-                                        found = "file_item"
-                                    if found:
-                                        break
-                                else:
-                                    raise ValueError(
-                                        "Unable to find push item with path:%s" % pitem["metadata"]["pushItemPath"]
-                                    )
-                                if found == "file_item":
-                                    pulp_push_unit = self.pulp_push_units[self.push_item_str(push_item)]
-                                    pulp_push_item = self.processed_push_items[self.push_item_str(push_item)]
-                                    pitem["metadata"]["downloadURL"] = pulp_push_unit.cdn_path
-                                    pitem["metadata"]["md5"] = pulp_push_item.md5sum
-                                    pitem["metadata"]["sha256"] = pulp_push_unit.sha256sum
-                                    pitem["metadata"]["size"] = os.stat(push_item.src).st_size
-                                else:
-                                    filename = pitem["metadata"]["pushItemPath"].split("/")[-1]
-                                    file_path = os.path.join(push_item.src, filename)
-                                    with open(file_path, "rb") as f:
-                                        bytes = f.read()
-                                        pitem["metadata"]["md5"] = hashlib.md5(bytes).hexdigest()
-                                        pitem["metadata"]["sha256"] = hashlib.sha256(bytes).hexdigest()
-                                    pitem["metadata"]["size"] = os.path.getsize(file_path)
-                                    pitem["metadata"]["downloadURL"] = (
-                                        "/content/origin/files/sha256/{0}/{1}/{2}".format(
-                                            pitem["metadata"]["sha256"][:2],
-                                            pitem["metadata"]["sha256"],
-                                            filename,
-                                        )
-                                    )
-                            # carry out CGW operations
-                            self.process_file(pitem)
-
-                    self.make_visible()
-                    LOG.info("\n All CGW operations are successfully completed...!")
-                except Exception as error:
-                    LOG.exception("Exception occurred during the CGW operation %s" % error)
-                    LOG.info("Rolling back the partial operation")
-                    self.rollback_cgw_operation()
-
-                    #  raising the occurred Exception as all the exception will get caught in this except block
-                    #  we want to return full Traceback
-                    raise error
+                    forks[index].process_cgw_items(cgw_items[index], wait=waits[index])
+                except Exception:
+                    failed.set()
+                    raise
+
+        if groups is None:
+            groups = group_related([{key[:2] for key in map(item_key, items) if key} for items in cgw_items])
+        errors = run_concurrently(process_group, groups, workers=self.item_workers)
+        if errors:
+            raise errors[0][1]
+
+    def _needs_pulp(self, item):
+        """
+        Check whether the item can't be processed before Pulp publishes its push item.
+
+        Args:
+            item (dict):
+                linear CGW item
+
+        Returns (bool):
+            Returns True for file items referring to a push item other than a directory.
+        """
+
+        push_item_path = (item.get("metadata") or {}).get("pushItemPath")
+        if item.get("type") != "file" or push_item_path is None:
+            return False
+        push_item = self.find_push_item(push_item_path)
+        return push_item is not None and not push_item.directory
+
+    def start_overlapped_operations(self):
+        """
+        Start the CGW operations which don't need Pulp while the Pulp push runs.
+
+        All the CGW push items are parsed and validated, then for every one of them:
+            - products, versions and files which don't refer to a Pulp push item
+              are processed right away on up to `item_workers` threads, CGW push
+              items touching the same products one after another
+            - files referring to a Pulp push item are processed once
+              :meth:`pulp_item_push_finished` is invoked for the push item
+            - items depending on the waiting files are left to
+              :meth:`push_staged_operations`
+
+        Versions and files are created invisible, they are made visible by
+        :meth:`push_staged_operations` after all the operations succeeded.
+        When the Pulp push fails, :meth:`abort_overlapped_operations` rolls
+        them back.
+        """
+
+        try:
+            cgw_items = self.parse_cgw_push_items()
+            for parsed_items in cgw_items:
+                self.start_checksums(parsed_items)
+        except Exception:
+            self.stop_checksums()
+            raise
+
+        # files resolved from push items are keyed by their version, tell them apart by their push item
+        path_counts = {}
+        for item in (item for items in cgw_items for item in items if self._needs_pulp(item)):
+            path_key = (item_key(item), item["metadata"]["pushItemPath"])
+            path_counts[path_key] = path_counts.get(path_key, 0) + 1
+
+        overlap = OverlapState(
+            forks=[self.fork() for _ in cgw_items],
+            groups=group_related([{key[:2] for key in map(item_key, items) if key} for items in cgw_items]),
+            deferred=[],
+            executor=ThreadPoolExecutor(max_workers=max(1, self.item_workers)),
+            file_executor=ThreadPoolExecutor(max_workers=max(1, self.workers)),
+            early=[None] * len(cgw_items),
+            files=[[] for _ in cgw_items],
+        )
+        early_items = []
+        for index, items in enumerate(cgw_items):
+            dependencies, _ = build_dependencies([item_key(item) for item in items])
+            deferred = []
+            waiting = []
+            for position, item in enumerate(items):
+                deferred_dependencies = [dep for dep in dependencies[position] if deferred[dep]]
+                deferred.append(self._needs_pulp(item) or bool(deferred_dependencies))
+                # only files depending on no other deferred items than waiting files, and sharing
+                # their push item with no other file of the version, are processed as their push
+                # items get published
+                waiting.append(
+                    self._needs_pulp(item)
+                    and all(waiting[dep] for dep in deferred_dependencies)
+                    and path_counts[(item_key(item), item["metadata"]["pushItemPath"])] == 1
+                )
+                if waiting[position]:
+                    push_item = self.find_push_item(item["metadata"]["pushItemPath"])
+                    overlap.waiting.setdefault(push_item.key, []).append((index, item))
+            early_items.append([item for item, is_deferred in zip(items, deferred) if not is_deferred])
+            overlap.deferred.append([item for item, is_deferred in zip(items, deferred) if is_deferred])
+
+        for group in overlap.groups:
+            future = overlap.executor.submit(overlap.process_early_items, group, early_items)
+            for index in group:
+                overlap.early[index] = future
+
+        LOG.info(
+            "Started %s CGW operations ahead of the Pulp push, %s files wait for their push items",
+            sum(len(items) for items in early_items),
+            sum(len(files) for files in overlap.waiting.values()),
+        )
+        with self._overlap_lock:
+            self._overlap = overlap
+        for key in list(overlap.waiting):
+            if key in self.pulp_push_units:
+                self._submit_waiting_files(key)
+
+    def _submit_waiting_files(self, key):
+        """
+        Start processing the files waiting for the published push item in the overlapped mode.
+
+        Args:
+            key (tuple):
+                push_item_key of the published push item
+        """
+
+        with self._overlap_lock:
+            overlap = self._overlap
+            if overlap is None:
+                return
+            for index, item in overlap.waiting.pop(key, []):
+                overlap.submit_file(index, item)
+
+    def finish_overlapped_operations(self):
+        """
+        Carry out the remaining CGW operations of the overlapped mode and make the records visible.
+
+        The items which haven't been started yet are processed after the ones
+        started during the Pulp push finished, in the groups of CGW push items
+        related by all their items, not only the remaining ones. Then every
+        CGW push item makes its records visible. A failed CGW push item is
+        rolled back including its operations carried out during the Pulp push.
+
+        The push deadline counts from here, it doesn't include the Pulp push.
+
+        Raises:
+            Exception:
+                The first exception raised by the CGW push items
+        """
+
+        with self._overlap_lock:
+            overlap = self._overlap
+            # files published from now on are processed with the remaining items
+            overlap.waiting = {}
+
+        self.start_deadline()
+        for fork in overlap.forks:
+            fork._deadline_at = self._deadline_at
+        remaining = [[item for item in items if id(item) not in overlap.submitted] for items in overlap.deferred]
+        try:
+            self.process_cgw_push_items(
+                remaining,
+                forks=overlap.forks,
+                waits=[overlap.waiter(index) for index in range(len(remaining))],
+                groups=overlap.groups,
+            )
+        finally:
+            overlap.shutdown()
+            with self._overlap_lock:
+                self._overlap = None
+
+    def abort_overlapped_operations(self):
+        """
+        Roll back the CGW operations started during a Pulp push which failed.
+
+        The operations which haven't started yet are cancelled, the running
+        ones are waited for, then every CGW push item rolls back its operations
+        and the checksum processes are stopped. Nothing is done when the
+        overlapped operations are not running, e.g. after
+        :meth:`push_staged_operations` finished them.
+        """
+
+        with self._overlap_lock:
+            overlap, self._overlap = self._overlap, None
+        try:
+            if overlap is None:
+                return
+            LOG.info("Aborting the CGW operations started during the Pulp push")
+            overlap.shutdown(cancel=True)
+            self.cgw_item_operations = [fork.completed_operations for fork in overlap.forks]
+            errors = run_concurrently(
+                lambda index: overlap.forks[index].discard_cgw_items(overlap.waiter(index)),
+                range(len(overlap.forks)),
+                workers=self.item_workers,
+            )
+            for _, error in errors:
+                LOG.error("Rolling back the CGW operations failed: %s", error)
+        finally:
+            self.stop_checksums()
+
+    @hookimpl
+    def task_stop(self, failed):
+        """
+        Invoked when the task ends.
+
+        The CGW operations started during the Pulp push which were not
+        finished by :meth:`push_staged_operations`, e.g. because the Pulp
+        push failed, are rolled back, see :meth:`abort_overlapped_operations`.
+
+        Args:
+            failed (bool):
+                whether the task is failing
+        """
+
+        self.abort_overlapped_operations()
+
+    def process_cgw_items(self, items, wait=None):
+        """
+        Process the items of one CGW push item, rolling back its operations on failure.
+
+        Args:
+            items (list(dict)):
+                sorted linear CGW items
+            wait (method|None):
+                callable waiting for the operations of the CGW push item started
+                before, raising their first exception
+        """
+
+        try:
+            if wait is not None:
+                wait()
+            self.process_items(items, process_file=self.process_staged_file, prefetch=True)
+            self.make_visible()
+            LOG.info("\n All CGW operations are successfully completed...!")
+        except Exception as error:
+            LOG.exception("Exception occurred during the CGW operation %s" % error)
+            LOG.info("Rolling back the partial operation")
+            self.rollback_cgw_operation()
+
+            #  raising the occurred Exception as all the exception will get caught in this except block
+            #  we want to return full Traceback
+            raise error
+
+    def discard_cgw_items(self, wait=None):
+        """
+        Roll back the operations of a CGW push item which won't be completed.
+
+        Args:
+            wait (method|None):
+                callable waiting for the operations of the CGW push item started
+                before, their exceptions are ignored
+        """
+
+        if wait is not None:
+            try:
+                wait()
+            except Exception:
+                pass
+        if self.completed_operations:
+            LOG.info("Rolling back the operations started before the failure of another CGW push item")
+            self.rollback_cgw_operation()
 
 
 def entry_point(source_urls, target_name, target_settings):
@@ -165,4 +962,6 @@ def entry_point(source_urls, target_name, target_settings):
     logging.basicConfig(level=logging.DEBUG, format=LOG_FORMAT)
     ret = PushStagedCGW(source_urls, target_name, target_settings)
     pm.register(ret)
+    if ret.overlapped:
+        ret.start_overlapped_operations()
     return ret
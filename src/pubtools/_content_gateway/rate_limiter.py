@@ -0,0 +1,197 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+# responses CGW uses to tell the client to slow down
+THROTTLE_STATUSES = frozenset((429, 503))
+# number of recent requests used to estimate the rate when none is set
+RATE_SAMPLES = 20
+# minimal seconds between two rate decreases, so a burst of throttled
+# responses to requests sent at the same time decreases the rate once
+DECREASE_INTERVAL = 1.0
+
+
+def parse_retry_after(value):
+    """Seconds to wait according to the Retry-After header.
+
+    Args:
+        value (str|None)
+            value of the header, either seconds or an HTTP date
+
+    Returns:
+        float|None: seconds to wait or None when the value is missing or invalid
+    """
+
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        seconds = date.timestamp() - time.time()
+    return max(0.0, seconds)
+
+
+def jittered(delay, jitter):
+    """Randomly shorten the delay by up to the `jitter` fraction of it.
+
+    Args:
+        delay (float)
+            delay in seconds
+        jitter (float)
+            fraction of the delay which may be left out, between 0 and 1
+
+    Returns:
+        float: delay in seconds
+    """
+
+    return delay * (1 - jitter * random.random())
+
+
+class RateLimiter(object):
+    """Token bucket limiting the rate of CGW requests shared by all the workers.
+
+    The rate adapts to the server (AIMD): every throttled response (429, 503)
+    decreases it multiplicatively, every other response increases it
+    additively up to `max_rate`. A Retry-After header pauses all the requests
+    for the given time, at most `max_pause` seconds. No wait lasts past the
+    `deadline`. Without `max_rate` the requests are not limited until
+    the first throttled response, the rate starts from the observed one then.
+    """
+
+    def __init__(self, max_rate=None, min_rate=0.5, increase=1.0, decrease=0.5, max_pause=None, clock=time.monotonic):
+        """Initializing.
+
+        Args:
+            max_rate (float|None)
+                maximum number of requests per second, None for no limit
+            min_rate (float)
+                the rate is never decreased below this number of requests per second
+            increase (float)
+                requests per second the rate grows by after a second worth of responses
+            decrease (float)
+                factor applied to the rate after a throttled response
+            max_pause (float|None)
+                the longest wait caused by a Retry-After header or by the rate,
+                None doesn't limit it
+            clock (method)
+                monotonic clock returning seconds
+        """
+
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_pause = max_pause
+        self.rate = max_rate
+        self.clock = clock
+        # clock() value no wait lasts past, None for no deadline
+        self.deadline = None
+        self.updated = clock()
+        self.tokens = self._capacity()
+        self.paused_until = self.updated
+        self.last_decrease = None
+        self._sent = deque(maxlen=RATE_SAMPLES)
+        self._lock = threading.Lock()
+
+    def _capacity(self):
+        """Number of requests which may be sent at once."""
+
+        return max(1.0, self.rate or 0)
+
+    def _refill(self, now):
+        """Add the tokens gained since the last update."""
+
+        if self.rate is not None:
+            self.tokens = min(self._capacity(), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _observed_rate(self, now):
+        """Rate of the recently reserved requests."""
+
+        if not self._sent:
+            return self.min_rate
+        span = max(now, self._sent[-1]) - self._sent[0]
+        return len(self._sent) / max(span, 1.0)
+
+    def reserve(self):
+        """Reserve a slot for one request.
+
+        Returns:
+            float: seconds to wait before sending the request
+        """
+
+        with self._lock:
+            now = self.clock()
+            start = max(now, self.paused_until)
+            if self.rate is not None:
+                self._refill(now)
+                self.tokens -= 1
+                if self.tokens < 0:
+                    start = max(start, now - self.tokens / self.rate)
+            self._sent.append(start)
+            return start - now
+
+    def cap(self, delay):
+        """Shorten a delay to `max_pause` and to the time remaining until the deadline.
+
+        Args:
+            delay (float)
+                seconds to wait
+
+        Returns:
+            float: seconds to wait
+        """
+
+        if self.max_pause is not None:
+            delay = min(delay, self.max_pause)
+        if self.deadline is not None:
+            delay = min(delay, max(0.0, self.deadline - self.clock()))
+        return delay
+
+    def wait(self):
+        """Block until a request may be sent or until the deadline."""
+
+        delay = self.cap(self.reserve())
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_throttle(self, retry_after=None):
+        """Slow down after a throttled response.
+
+        Args:
+            retry_after (float|None)
+                seconds the server asked to wait before the next request
+        """
+
+        with self._lock:
+            now = self.clock()
+            if retry_after:
+                if self.max_pause is not None:
+                    retry_after = min(retry_after, self.max_pause)
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if self.last_decrease is not None and now - self.last_decrease < DECREASE_INTERVAL:
+                return
+            self._refill(now)
+            rate = self.rate if self.rate is not None else self._observed_rate(now)
+            self.rate = max(self.min_rate, rate * self.decrease)
+            self.tokens = min(self.tokens, self._capacity())
+            self.last_decrease = now
+
+    def on_success(self):
+        """Speed up after a response which wasn't throttled."""
+
+        with self._lock:
+            if self.rate is None:
+                return
+            self._refill(self.clock())
+            rate = self.rate + self.increase / max(1.0, self.rate)
+            self.rate = rate if self.max_rate is None else min(self.max_rate, rate)
@@ -0,0 +1,295 @@
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LOG = logging.getLogger("pubtools.cgw")
+
+# marks the end of the scheduled items
+_END = object()
+
+
+def item_key(item):
+    """
+    Returns the catalog key of a linear CGW item.
+
+    The keys follow the product -> version -> file hierarchy, so the key of
+    a parent record is always a prefix of the keys of its children:
+        - product: (name, productCode)
+        - product_version: (productName, productCode, versionName)
+        - file: (productName, productCode, productVersionName, downloadURL)
+
+    Files which are resolved from push items do not know their downloadURL
+    yet, they are keyed by their version instead, so they are related to the
+    version and to all its files, e.g. a delete of the file they resolve to.
+
+    Args:
+        item (dict):
+            linear CGW item
+
+    Returns:
+        key (tuple|None):
+            Returns the key or None for unknown item types.
+    """
+
+    metadata = item.get("metadata") or {}
+    item_type = item.get("type")
+    if item_type == "product":
+        return (metadata.get("name"), metadata.get("productCode"))
+    if item_type == "product_version":
+        return (
+            metadata.get("productName"),
+            metadata.get("productCode"),
+            metadata.get("versionName"),
+        )
+    if item_type == "file":
+        key = (
+            metadata.get("productName"),
+            metadata.get("productCode"),
+            metadata.get("productVersionName"),
+        )
+        if metadata.get("downloadURL") is None:
+            return key
+        return key + (metadata["downloadURL"],)
+    return None
+
+
+class DependencyTracker:
+    """
+    Find the dependencies of items arriving one by one, see :func:`build_dependencies`.
+
+    The index of the last item of every key and the descendant keys of every
+    key prefix are kept, so the memory grows with the number of distinct keys.
+    """
+
+    def __init__(self):
+        """Initialize without any items."""
+
+        self.count = 0
+        self._last_item = {}
+        self._descendants = defaultdict(set)
+
+    def add(self, key):
+        """
+        Add the next item.
+
+        Args:
+            key (tuple|None):
+                key of the item
+
+        Returns:
+            set(int): Returns the indexes of the preceding items the item depends on.
+        """
+
+        index = self.count
+        self.count += 1
+        depends_on = set()
+        if key is not None:
+            for size in range(2, len(key) + 1):
+                if key[:size] in self._last_item:
+                    depends_on.add(self._last_item[key[:size]])
+            for descendant in self._descendants.get(key, ()):
+                depends_on.add(self._last_item[descendant])
+
+            self._last_item[key] = index
+            for size in range(2, len(key)):
+                self._descendants[key[:size]].add(key)
+        return depends_on
+
+
+def build_dependencies(keys):
+    """
+    Build the dependency graph of the items identified by keys.
+
+    Two items are related when the key of one of them is a prefix of the key
+    of the other one (or both keys are equal). Related items keep the order
+    in which they are passed, unrelated items don't depend on each other.
+    Together with :func:`utils.sort_items` this keeps all the parents
+    created before their children and all the children deleted before
+    their parents.
+
+    Only the last item of every related key is recorded as a dependency,
+    the earlier ones are reachable through it.
+
+    Args:
+        keys (list(tuple|None)):
+            item keys in the execution order
+
+    Returns:
+        (list(set(int)), list(list(int))):
+            Returns the indexes each item depends on and the indexes
+            depending on each item.
+    """
+
+    dependencies = []
+    dependents = []
+    tracker = DependencyTracker()
+
+    for index, key in enumerate(keys):
+        depends_on = tracker.add(key)
+        dependencies.append(depends_on)
+        dependents.append([])
+        for dependency in depends_on:
+            dependents[dependency].append(index)
+
+    return dependencies, dependents
+
+
+def group_related(key_sets):
+    """
+    Group the indexes of the key sets which share a key, directly or through other sets.
+
+    Args:
+        key_sets (list(set)):
+            keys used by every set of items
+
+    Returns:
+        list(list(int)): Returns the groups of indexes ordered by their first index,
+        the indexes of a group are in ascending order.
+    """
+
+    root = list(range(len(key_sets)))
+
+    def find(index):
+        while root[index] != index:
+            root[index] = root[root[index]]
+            index = root[index]
+        return index
+
+    owner = {}
+    for index, keys in enumerate(key_sets):
+        for key in keys:
+            if key not in owner:
+                owner[key] = index
+                continue
+            first, second = find(owner[key]), find(index)
+            root[max(first, second)] = min(first, second)
+
+    groups = {}
+    for index in range(len(key_sets)):
+        groups.setdefault(find(index), []).append(index)
+    return list(groups.values())
+
+
+def run_concurrently(func, items, workers=1):
+    """
+    Call func for every item on up to `workers` threads.
+
+    All the calls are carried out even if some of them fail.
+
+    Args:
+        func (method):
+            callable taking a single item
+        items (iterable):
+            items to process
+        workers (int):
+            maximum number of calls running at the same time
+
+    Returns:
+        list(tuple): Returns (item, exception) pairs of the failed calls in the item order.
+    """
+
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(func, item) for item in items]
+    return [(item, future.exception()) for item, future in zip(items, futures) if future.exception() is not None]
+
+
+class OperationScheduler:
+    """Run CGW operations on a bounded worker pool in dependency order."""
+
+    # items read ahead per worker while the operations they depend on run
+    READ_AHEAD = 100
+
+    def __init__(self, items, workers=1):
+        """
+        Initialize.
+
+        Args:
+            items (iterable(dict)):
+                sorted linear CGW items, an iterator is consumed only as far
+                as needed to keep the workers busy
+            workers (int):
+                maximum number of operations running at the same time
+        """
+
+        self.items = items
+        self.workers = max(1, workers)
+
+    def run(self, process):
+        """
+        Call process for every item as soon as all the items it depends on are done.
+
+        The items are read as the workers need them, so the first operations
+        start before the last items are produced. An item is kept only while
+        it waits or runs, the key and index of every item read are kept until
+        the end though, see :class:`DependencyTracker`.
+
+        After the first failure no new operation is started, the running ones
+        are waited for and the first error is raised.
+
+        Args:
+            process (method):
+                callable processing a single item
+
+        Raises:
+            Exception:
+                The first exception raised by process
+        """
+
+        items = iter(self.items)
+        tracker = DependencyTracker()
+        # index -> [item, number of unfinished dependencies] of the items not started yet
+        waiting = {}
+        dependents = defaultdict(list)
+        # indexes of the items read and not finished yet
+        unfinished = set()
+        ready = deque()
+        running = {}
+        errors = []
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                while (
+                    not exhausted
+                    and not errors
+                    and len(running) + len(ready) < self.workers
+                    and (not running or len(waiting) < self.workers * self.READ_AHEAD)
+                ):
+                    item = next(items, _END)
+                    if item is _END:
+                        exhausted = True
+                        break
+                    index = tracker.count
+                    depends_on = tracker.add(item_key(item)) & unfinished
+                    unfinished.add(index)
+                    for dependency in depends_on:
+                        dependents[dependency].append(index)
+                    if depends_on:
+                        waiting[index] = [item, len(depends_on)]
+                    else:
+                        ready.append((index, item))
+
+                while ready and not errors and len(running) < self.workers:
+                    index, item = ready.popleft()
+                    running[executor.submit(process, item)] = index
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                        continue
+                    unfinished.discard(index)
+                    for dependent in dependents.pop(index, ()):
+                        waiting[dependent][1] -= 1
+                        if not waiting[dependent][1]:
+                            ready.append((dependent, waiting.pop(dependent)[0]))
+
+        if errors:
+            if len(errors) > 1:
+                LOG.error("%s CGW operations failed, raising the first error", len(errors))
+            raise errors[0]
@@ -1,11 +1,56 @@
 import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import SequenceEndEvent, SequenceStartEvent, StreamEndEvent
 from yaml.loader import SafeLoader
-from jsonschema import validate
+from yaml.resolver import Resolver
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from jsonschema.exceptions import ValidationError, best_match
+from jsonschema.validators import validator_for
+import functools
+import hashlib
+import itertools
 import logging
-import copy
+import multiprocessing
+
+from .scheduler import item_key
+
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover
+    fastjsonschema = None
+
+try:
+    from yaml.cyaml import CParser, CSafeLoader
+except ImportError:  # pragma: no cover
+    CParser = CSafeLoader = None
 
 LOG = logging.getLogger("pubtools.cgw")
 
+if CParser is not None:
+
+    class CStreamLoader(CParser, Composer, SafeConstructor, Resolver):
+        """Safe loader using the libyaml parser with the nodes composed in Python, one by one."""
+
+        def __init__(self, stream):
+            """Initialize the loader reading the stream."""
+
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+
+# libyaml is used when available, the pure-Python loaders produce the same data
+YAML_LOADER = CSafeLoader or SafeLoader
+YAML_STREAM_LOADER = CStreamLoader if CParser is not None else SafeLoader
+
+# bytes read at once when computing file checksums
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+# items validated at once by a worker process
+VALIDATION_CHUNK_SIZE = 1000
+
 PRODUCT_SCHEMA = {
     "type": "object",
     "properties": {
@@ -120,11 +165,100 @@ FILE_SCHEMA = {
 }
 
 
+# fields required by the oneOf branches of the file metadata, in the branch order
+FILE_BRANCH_FIELDS = ("pushItemPath", "downloadURL")
+
+
+class CompiledSchema(object):
+    """JSON schema checked and compiled once, reused for all the validated items.
+
+    With the optional `fastjsonschema` dependency the items are checked by
+    the code it generates. An item it rejects is checked again by
+    jsonschema, so the accepted items and the raised errors are always the
+    same as the ones of :func:`jsonschema.validate`.
+    """
+
+    def __init__(self, schema):
+        """Initializing.
+
+        Args:
+            schema (dict)
+                JSON schema
+        """
+
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        self.validator = validator_class(schema)
+        self._fast_validate = fastjsonschema.compile(schema) if fastjsonschema is not None else None
+
+    def is_valid(self, instance):
+        """Check whether the instance is valid under the schema.
+
+        Args:
+            instance (dict)
+                validated data
+
+        Returns:
+            bool: True if the instance is valid
+        """
+
+        if self._fast_validate is not None:
+            try:
+                self._fast_validate(instance)
+                return True
+            except fastjsonschema.JsonSchemaException:
+                pass
+        return self.validator.is_valid(instance)
+
+    def validate(self, instance):
+        """Validate the instance like :func:`jsonschema.validate`.
+
+        Args:
+            instance (dict)
+                validated data
+
+        Raises:
+            ValidationError
+                The most relevant error when the instance is invalid
+        """
+
+        if not self.is_valid(instance):
+            raise best_match(self.validator.iter_errors(instance))
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_schemas():
+    """Compile the CGW item schemas on first use.
+
+    Besides the schema of every item type, each branch of the oneOf file
+    metadata is compiled on its own under the ("file", <required field>) key.
+
+    Returns:
+        dict: CompiledSchema by item type
+    """
+
+    schemas = {
+        "product": CompiledSchema(PRODUCT_SCHEMA),
+        "product_version": CompiledSchema(VERSION_SCHEMA),
+        "file": CompiledSchema(FILE_SCHEMA),
+    }
+    for field, branch in zip(FILE_BRANCH_FIELDS, FILE_SCHEMA["properties"]["metadata"]["oneOf"]):
+        schemas[("file", field)] = CompiledSchema(
+            dict(FILE_SCHEMA, properties=dict(FILE_SCHEMA["properties"], metadata=branch))
+        )
+    return schemas
+
+
 def validate_data(json_data):
     """
     Validate that json_data contains all the necessary data
     with defined with json schemas
 
+    The schemas are compiled only once. File metadata holding exactly
+    one of the fields required by the oneOf branches can only match that
+    branch, so only the branch is checked, the whole schema only when it
+    fails to raise the same error.
+
     Args:
         json_data (dict)
             JSON dictionary with content gateway data
@@ -136,34 +270,224 @@ def validate_data(json_data):
         True: if validation succeed
     """
 
-    item_type = json_data.get("type")
-    if item_type == "product":
-        validate(instance=json_data, schema=PRODUCT_SCHEMA)
-    elif item_type == "product_version":
-        validate(instance=json_data, schema=VERSION_SCHEMA)
-    elif item_type == "file":
-        validate(instance=json_data, schema=FILE_SCHEMA)
-    LOG.info("Data validation successful for %s: %s" % (item_type, json_data.get("metadata").get("productCode")))
+    check_item(json_data)
+    LOG.info(
+        "Data validation successful for %s: %s" % (json_data.get("type"), json_data.get("metadata").get("productCode"))
+    )
     return True
 
 
+def check_item(json_data):
+    """
+    Validate the item like :func:`validate_data` without logging it
+
+    Args:
+        json_data (dict)
+            JSON dictionary with content gateway data
+
+    Raises:
+        ValidationError
+            The json_data type doesn't match with schema
+    """
+
+    item_type = json_data.get("type")
+    schemas = compiled_schemas()
+    if item_type == "file":
+        metadata = json_data.get("metadata")
+        fields = [field for field in FILE_BRANCH_FIELDS if isinstance(metadata, dict) and field in metadata]
+        if len(fields) != 1 or not schemas[("file", fields[0])].is_valid(json_data):
+            schemas["file"].validate(json_data)
+    elif item_type in schemas:
+        schemas[item_type].validate(json_data)
+
+
+def validate_chunk(items, start=0):
+    """
+    Collect the validation errors of the items
+
+    Args:
+        items (list(dict))
+            JSON dictionaries with content gateway data
+        start (int)
+            index of the first item
+    Returns:
+        list(dict): errors with the item `index`, `type`, `productCode` and `error` message
+    """
+
+    errors = []
+    for index, item in enumerate(items, start):
+        try:
+            check_item(item)
+        except ValidationError as error:
+            path = "/".join(str(part) for part in error.absolute_path)
+            metadata = item.get("metadata")
+            errors.append(
+                {
+                    "index": index,
+                    "type": item.get("type"),
+                    "productCode": metadata.get("productCode") if isinstance(metadata, dict) else None,
+                    "error": "%s: %s" % (path, error.message) if path else error.message,
+                }
+            )
+    return errors
+
+
+def process_context():
+    """
+    Multiprocessing context of the process pools.
+
+    The push runs threads (e.g. the CGW workers), forking such a process
+    may deadlock in the child, so the pool processes are started by a fork
+    server, or spawned where it is not available.
+
+    Returns:
+        multiprocessing.context.BaseContext: context starting the pool processes
+    """
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")  # pragma: no cover
+
+
+def validate_items(items, workers=1, chunk_size=VALIDATION_CHUNK_SIZE):
+    """
+    Validate all the items, collecting every error instead of stopping at the first one
+
+    The items are validated in chunks as they are read. With more than
+    one worker and more than one chunk of items the chunks are validated
+    on a pool of `workers` processes, only a few chunks per process are
+    read ahead.
+
+    Args:
+        items (iterable(dict))
+            JSON dictionaries with content gateway data
+        workers (int)
+            number of processes validating the chunks
+        chunk_size (int)
+            number of items validated at once by a process
+    Returns:
+        list(dict): errors in the item order, see :func:`validate_chunk`
+    """
+
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
+    first_chunks = list(itertools.islice(chunks, 2))
+    starts = itertools.count(0, chunk_size)
+    if workers <= 1 or len(first_chunks) <= 1:
+        return [
+            error
+            for start, chunk in zip(starts, itertools.chain(first_chunks, chunks))
+            for error in validate_chunk(chunk, start)
+        ]
+
+    errors = []
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as executor:
+        for start, chunk in zip(starts, itertools.chain(first_chunks, chunks)):
+            pending.append(executor.submit(validate_chunk, chunk, start))
+            if len(pending) >= 2 * workers:
+                errors.extend(pending.popleft().result())
+        while pending:
+            errors.extend(pending.popleft().result())
+    return errors
+
+
 def yaml_parser(file_path):
     """
     Parse the yaml data into json data
 
+    Only the first document of the file is parsed.
+
     Args:
         file_path (str)
             JSON dictionary with content gateway data
     Raises:
         FileNotFoundError
             If the file_path cannot be found
+        ValueError
+            If the file holds no yaml document
     Returns:
         list(dict): parsed json data from yaml file
     """
 
     with open(file_path) as f:
-        data = list(yaml.load_all(f, Loader=SafeLoader))
-    return data[0]
+        for data in yaml.load_all(f, Loader=YAML_LOADER):
+            return data
+    raise ValueError("No YAML document found in %s" % file_path)
+
+
+def yaml_items(file_path):
+    """
+    Parse the items of the yaml list one by one
+
+    Only the parser events of a single item are composed at once, so the
+    memory used doesn't grow with the number of the items. Aliases may
+    refer to anchors of the preceding items.
+
+    Args:
+        file_path (str)
+            path of the yaml file holding a list
+    Raises:
+        FileNotFoundError
+            If the file_path cannot be found
+        ValueError
+            If the first document of the file isn't a list
+    Yields:
+        dict: parsed json data of the list items
+    """
+
+    with open(file_path) as f:
+        loader = YAML_STREAM_LOADER(f)
+        try:
+            # stream and document start
+            loader.get_event()
+            if loader.check_event(StreamEndEvent):
+                raise ValueError("No YAML document found in %s" % file_path)
+            loader.get_event()
+            if not loader.check_event(SequenceStartEvent):
+                raise ValueError("YAML document in %s is not a list" % file_path)
+            loader.get_event()
+            index = 0
+            while not loader.check_event(SequenceEndEvent):
+                yield loader.construct_document(loader.compose_node(None, index))
+                index += 1
+        finally:
+            loader.dispose()
+
+
+def file_checksums(file_path, chunk_size=CHECKSUM_CHUNK_SIZE):
+    """
+    Compute the checksums and size of the file in a single pass
+
+    The file is read in chunks into one reused buffer, so the memory used
+    doesn't depend on the file size.
+
+    Args:
+        file_path (str)
+            path of the file
+        chunk_size (int)
+            number of bytes read at once
+    Raises:
+        FileNotFoundError
+            If the file_path cannot be found
+    Returns:
+        dict: md5 and sha256 hex digests and size of the file
+    """
+
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    size = 0
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            length = f.readinto(buffer)
+            if not length:
+                break
+            md5.update(view[:length])
+            sha256.update(view[:length])
+            size += length
+    return {"md5": md5.hexdigest(), "sha256": sha256.hexdigest(), "size": size}
 
 
 def sort_items(items):
@@ -243,11 +567,102 @@ def sort_items(items):
     return sorted_items
 
 
+def iter_collect_parents(items, parents):
+    """
+    Collect the keys of the created and updated products and versions while the items are read
+
+    The keys tell :func:`iter_sorted_items` which parents the items of
+    a later pass need to wait for.
+
+    Args:
+        items (iterable(dict))
+            linear JSON dictionaries
+        parents (set)
+            the keys are added to
+    Yields:
+        dict: JSON dictionaries
+    """
+
+    for data in items:
+        if data.get("type") in ("product", "product_version") and data.get("action") in ("create", "update"):
+            parents.add(item_key(data))
+        yield data
+
+
+def iter_sorted_items(items, parents=None):
+    """
+    Sort the items like :func:`sort_items` while they are read
+
+    Created and updated items are yielded as soon as they are read unless
+    they wait for their parent:
+        - versions wait until a created or updated product of theirs is yielded
+        - files wait until a created or updated version of theirs is yielded
+    The items waiting for a parent which doesn't come are yielded after all
+    the other items are read, versions first, then files. When the keys of
+    the parents the items create or update are known, see
+    :func:`iter_collect_parents`, the items of the other parents don't wait.
+
+    Deleted items have to follow all the created and updated items, they are
+    yielded at the end, files, versions and products in this order.
+
+    Related items of the same type keep their order, a child may however come
+    before an update of its parent read later. The deleted items, the items
+    waiting for their parents and the keys of the yielded products and
+    versions are kept in memory.
+
+    Args:
+        items (iterable(dict))
+            JSON dictionaries
+        parents (set|None)
+            keys of all the products and versions created or updated by the items,
+            the items wait for any parent by default
+    Yields:
+        dict: JSON dictionaries
+    """
+
+    parent_key_size = {"product_version": 2, "file": 3}
+    deletes = {"product": [], "product_version": [], "file": []}
+    # parent key -> (position, item) of the items waiting for the parent
+    blocked = {}
+    released = set()
+
+    def release(item):
+        queue = deque([item])
+        while queue:
+            item = queue.popleft()
+            yield item
+            if item["type"] != "file":
+                key = item_key(item)
+                released.add(key)
+                queue.extend(waiting for _, waiting in blocked.pop(key, ()))
+
+    for position, data in enumerate(items):
+        if data["type"] not in deletes:
+            continue
+        if data["action"] not in ["create", "update"]:
+            deletes[data["type"]].append(data)
+            continue
+        parent_key = item_key(data)[: parent_key_size.get(data["type"], 0)]
+        if parent_key and parent_key not in released and (parents is None or parent_key in parents):
+            blocked.setdefault(parent_key, []).append((position, data))
+            continue
+        yield from release(data)
+
+    # releasing a version releases only its files, so the files left are read after the versions are released
+    for item_type in ("product_version", "file"):
+        remaining = [entry for entries in blocked.values() for entry in entries if entry[1]["type"] == item_type]
+        for _, data in sorted(remaining, key=lambda entry: entry[0]):
+            yield from release(data)
+
+    for item_type in ("file", "product_version", "product"):
+        yield from deletes[item_type]
+
+
 def format_cgw_items(items):
     """
     The yaml file can accept both linear and nested data structure
     and the function will re-format the yaml nested data structure to linear data structure
-    inorder to process.
+    inorder to process, see :func:`iter_format_cgw_items`.
 
     Args:
         items (list(dict))
@@ -256,34 +671,52 @@ def format_cgw_items(items):
         list(dict): list of JSON dictionary
     """
 
-    formatted_list = list()
+    return list(iter_format_cgw_items(items))
+
+
+def iter_format_cgw_items(items):
+    """
+    The yaml file can accept both linear and nested data structure
+    and the function will re-format the yaml nested data structure to linear data structure
+    inorder to process.
+
+    The nested records are converted level by level into new dictionaries,
+    the input data is left intact. Linear records are passed as they are.
+
+    The items are converted one by one as they are read.
+
+    Args:
+        items (iterable(dict))
+            JSON dictionaries
+    Yields:
+        dict: linear JSON dictionaries
+    """
+
     for product_rec in items:
         if product_rec.get("type"):
             """
             Checking whether the cgw data structure is nested or linear.
                 - For the linear structure "type", "action" and "metadata" keys will be present
-                - If data is of linear type, we are appending the record directly in the formatted_list list
+                - If data is of linear type, we are yielding the record directly
                 - Else we are re-formatting nested data into linear data in the outer scope of the "if" condition.
             """
-            formatted_list.append(product_rec)
+            yield product_rec
             continue
 
-        # creating a temp record of product data
-        product_metadata = copy.deepcopy(product_rec["product"])
+        # creating a new product record without the nested releases, the nested records
+        # are neither copied nor modified to keep original data intact
+        product_metadata = {
+            key: value for key, value in product_rec["product"].items() if key not in ("releases", "action")
+        }
         # this action value will be shared crossed to child records i.e versions and files
-        action = product_metadata["action"]
+        action = product_rec["product"]["action"]
         payload = {"type": "product", "action": action}
-        # performing further operations on temp record
-        # i.e "product_metadata" to keep original data intact
-        # and removing unnecessary fields from the temp product_metadata to form expected metadata
-        product_metadata.pop("releases", None)
-        product_metadata.pop("action", None)
         # expected metadata is ready, adding to the main dict
         payload["metadata"] = product_metadata
         product_name = product_metadata["name"]
         product_code = product_metadata["productCode"]
         # nested product data got converted to linear structure
-        formatted_list.append(payload)  # adding record to the result list
+        yield payload
 
         # re-formatting nested versions records in linear order
         # version follows the same steps as product
@@ -292,13 +725,12 @@ def format_cgw_items(items):
             for version_rec in product_rec.get("product").get("releases"):
                 # version shares the same action value as product
                 version_payload = {"type": "product_version", "action": action}
-                version_metadata = copy.deepcopy(version_rec)
+                version_metadata = {key: value for key, value in version_rec.items() if key != "files"}
+                version_metadata["productName"] = product_name
+                version_metadata["productCode"] = product_code
                 version_payload["metadata"] = version_metadata
-                version_payload["metadata"]["productName"] = product_name
-                version_payload["metadata"]["productCode"] = product_code
                 version_name = version_metadata["versionName"]
-                version_metadata.pop("files", None)
-                formatted_list.append(version_payload)
+                yield version_payload
 
                 order = 0
                 # re-formatting nested file records in linear order
@@ -309,11 +741,11 @@ def format_cgw_items(items):
                         # file shares the same action value as product
                         file_payload = {"type": "file", "action": action}
                         order = file_rec.get("order") if file_rec.get("order") is not None else order + 10
-                        file_rec["order"] = file_rec.get("order") if file_rec.get("order") else order
-                        file_payload["metadata"] = file_rec
-                        file_payload["metadata"]["productName"] = product_name
-                        file_payload["metadata"]["productCode"] = product_code
-                        file_payload["metadata"]["productVersionName"] = version_name
-                        formatted_list.append(file_payload)
-
-    return formatted_list
+                        file_payload["metadata"] = dict(
+                            file_rec,
+                            order=file_rec.get("order") if file_rec.get("order") else order,
+                            productName=product_name,
+                            productCode=product_code,
+                            productVersionName=version_name,
+                        )
+                        yield file_payload
@@ -40,6 +40,12 @@ class TestClient(object, metaclass=TestClientMeta):
         self.pvid_counter = 0
         self.fid_counter = 0
 
+    def set_deadline(self, seconds):
+        self.deadline = seconds
+
+    def pool_stats(self):
+        return {"opened": 0, "reused": 0, "discarded": 0}
+
     def get_products(self, params=None):
         return self.products.values()
 
@@ -112,7 +118,7 @@ class TestClient(object, metaclass=TestClientMeta):
             raise CGWClientError(
                 "content gateway API returned error: " "\nstatus_code: 404, reason: %s" % ("product not found")
             )
-        if data["id"] not in self.product_versions:
+        if data["id"] not in self.product_versions[pid]:
             raise CGWClientError(
                 "content gateway API returned error: " "\nstatus_code: 404, reason: %s" % ("version not found")
             )
@@ -196,7 +202,7 @@ class TestClient(object, metaclass=TestClientMeta):
             raise CGWClientError(
                 "content gateway API returned error: " "\nstatus_code: 404, reason: %s" % ("version not found")
             )
-        if data["id"] not in self.files:
+        if data["id"] not in self.files[pid][vid]:
             raise CGWClientError(
                 "content gateway API returned error: " "\nstatus_code: 404, reason: %s" % ("file not found")
             )
@@ -1,11 +1,24 @@
+import asyncio
+import http.server
+import inspect
+import threading
+import time
+
+import httpx
 import pytest
 import requests_mock
 from pubtools._content_gateway.cgw_client import (
+    AsyncCGWClient,
     CGWClient,
     CGWClientError,
 )
 from pubtools._content_gateway.cgw_authentication import CGWBasicAuth
 
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
 
 @pytest.fixture
 def get_all_products_response_json():
@@ -667,3 +680,252 @@ def test_cgw_error_with_empty_host():
         with pytest.raises(CGWClientError) as exception:
             CGWClient(None)
         assert "No content gateway hostname found" in str(exception.value.message)
+
+
+def run_async_client(handler, coroutine_factory):
+    async def run():
+        async with AsyncCGWClient(
+            "https://fake-host/", CGWBasicAuth("foo", "bar"), transport=httpx.MockTransport(handler)
+        ) as client:
+            return await coroutine_factory(client)
+
+    return asyncio.run(run())
+
+
+def api_method_names():
+    return [
+        name
+        for name, member in inspect.getmembers(CGWClient, inspect.isfunction)
+        if not name.startswith("_") and name not in ("call_cgw_api", "pool_stats", "set_deadline")
+    ]
+
+
+@pytest.mark.parametrize("method_name", api_method_names())
+def test_async_client_endpoint_parity(method_name):
+    args = [
+        {"id": 1} if name == "data" else 1 for name in inspect.signature(getattr(CGWClient, method_name)).parameters
+    ]
+    args = args[1:]
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"id": 1})
+        sync_result = getattr(CGWClient("https://fake-host/", CGWBasicAuth("foo", "bar")), method_name)(*args)
+        sync_request = m.request_history[0]
+
+    async_requests = []
+
+    def handler(request):
+        async_requests.append(request)
+        return httpx.Response(200, json={"id": 1})
+
+    async_result = run_async_client(handler, lambda client: getattr(client, method_name)(*args))
+
+    assert async_result == sync_result
+    assert len(async_requests) == 1
+    assert async_requests[0].method == sync_request.method
+    assert str(async_requests[0].url) == sync_request.url
+    assert async_requests[0].content == (sync_request.body or "").encode()
+    assert async_requests[0].headers["Authorization"] == sync_request.headers["Authorization"]
+
+
+def test_async_client_error_status():
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(lambda request: httpx.Response(404, text="not found"), lambda client: client.get_product(1))
+
+    assert "status_code: 404, reason: Not Found, error: not found" in exception.value.message
+
+
+@mock.patch("pubtools._content_gateway.rate_limiter.random.random", return_value=0)
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_retries_server_errors(patched_sleep, patched_random):
+    statuses = [502, 500, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json=[])
+
+    assert run_async_client(handler, lambda client: client.get_products()) == []
+    assert [call.args[0] for call in patched_sleep.call_args_list] == [0, 4]
+
+
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_retries_exhausted(patched_sleep):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(500, json=[])
+
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(handler, lambda client: client.get_products())
+
+    assert exception.value.message == (
+        "Error: Exception occurred during API call: "
+        "Max retries exceeded with url: /products (too many 500 error responses)"
+    )
+    assert len(requests) == 4
+
+
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_post_not_retried(patched_sleep):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            raise httpx.ReadTimeout("timed out")
+        return httpx.Response(503, text="unavailable")
+
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(handler, lambda client: client.update_product({"id": 1}))
+    assert exception.value.message == "Error: Exception occurred during API call: timed out"
+
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(handler, lambda client: client.update_product({"id": 1}))
+    assert "API returned error: \nstatus_code: 503" in exception.value.message
+
+    assert len(requests) == 2
+    patched_sleep.assert_not_called()
+
+
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_honors_retry_after(patched_sleep):
+    responses = [httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200, json=[])]
+
+    def get_products(client):
+        get_products.limiter = client.cgw_session.limiter
+        return client.get_products()
+
+    assert run_async_client(lambda request: responses.pop(0), get_products) == []
+    assert patched_sleep.call_args_list[0].args[0] == 7
+    # throttled to the minimal rate, increased by the successful response
+    assert get_products.limiter.rate == 1.5
+
+
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_caps_retry_after(patched_sleep):
+    responses = [httpx.Response(503, headers={"Retry-After": "3600"}), httpx.Response(200, json=[])]
+
+    def get_products(client):
+        client.set_deadline(60)
+        return client.get_products()
+
+    assert run_async_client(lambda request: responses.pop(0), get_products) == []
+    assert 0 < patched_sleep.call_args_list[-1].args[0] <= 60
+    # the request after the pause waits until the deadline at most too
+    assert all(call.args[0] <= 60 for call in patched_sleep.call_args_list)
+
+
+@mock.patch("pubtools._content_gateway.cgw_session.asyncio.sleep")
+def test_async_client_connection_error(patched_sleep):
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(handler, lambda client: client.get_products())
+
+    assert "Exception occurred during API call: connection refused" in exception.value.message
+    assert patched_sleep.call_count == 3
+
+
+def test_async_client_without_hostname():
+    with pytest.raises(CGWClientError) as exception:
+        AsyncCGWClient("")
+    assert exception.value.message == "No content gateway hostname found"
+
+
+def test_async_client_wrong_method():
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(lambda request: httpx.Response(200), lambda client: client.call_cgw_api("PATCH", "/"))
+    assert exception.value.message == "Wrong request method passed"
+
+
+def test_deadline_exceeded(cgw_client):
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "mock://test.com/products", json=[])
+        cgw_client.set_deadline(0)
+        with pytest.raises(CGWClientError) as exception:
+            cgw_client.get_products()
+        assert exception.value.message == "Error: Exception occurred during API call: CGW push deadline exceeded"
+        assert m.call_count == 0
+
+        cgw_client.set_deadline(None)
+        assert cgw_client.get_products() == []
+
+
+def test_async_client_timeouts():
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json=[])
+
+    def get_products(client):
+        client.cgw_session.timeout = (5, 30)
+        return client.get_products()
+
+    run_async_client(handler, get_products)
+    assert timeouts[0]["connect"] == 5
+    assert timeouts[0]["read"] == 30
+
+
+def test_async_client_deadline_exceeded():
+    def get_products(client):
+        client.set_deadline(0)
+        return client.get_products()
+
+    with pytest.raises(CGWClientError) as exception:
+        run_async_client(lambda request: httpx.Response(200, json=[]), get_products)
+    assert exception.value.message == "Error: Exception occurred during API call: CGW push deadline exceeded"
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # let concurrent requests overlap
+        time.sleep(0.1)
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def keep_alive_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%s/" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_async_client_pool_stats(keep_alive_server):
+    async def run():
+        async with AsyncCGWClient(keep_alive_server, CGWBasicAuth("foo", "bar"), pool_maxsize=1) as client:
+            assert client.pool_stats() == {"opened": 0, "reused": 0, "discarded": 0}
+            await client.get_products()
+            await client.get_products()
+            assert client.pool_stats() == {"opened": 1, "reused": 1, "discarded": 0}
+
+            await asyncio.gather(client.get_products(), client.get_products())
+            return client.pool_stats()
+
+    assert asyncio.run(run()) == {"opened": 2, "reused": 2, "discarded": 1}
+
+
+def test_async_client_pool_stats_custom_transport():
+    def get_products(client):
+        async def run():
+            await client.get_products()
+            return client.pool_stats()
+
+        return run()
+
+    stats = run_async_client(lambda request: httpx.Response(200, json=[]), get_products)
+    assert stats == {"opened": 0, "reused": 0, "discarded": 0}
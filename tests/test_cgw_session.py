@@ -2,7 +2,16 @@ try:
     from unittest.mock import patch
 except ImportError:
     from mock import patch
-from pubtools._content_gateway.cgw_session import CGWSession
+
+import time
+
+import pytest
+import requests
+
+from requests.packages.urllib3.response import HTTPResponse
+
+from pubtools._content_gateway.cgw_session import BACKOFF_MAX, CGWRetry, CGWSession
+from pubtools._content_gateway.rate_limiter import RateLimiter
 
 
 @patch("requests.Session.get")
@@ -16,7 +25,138 @@ def test_cgw_session_methods(patched_delete, patched_put, patched_post, patched_
     cgw_session.put("/fake-end-point")
     cgw_session.delete("/fake-end-point")
 
-    patched_get.assert_called_with("https://fake-host/fake-end-point", verify=True)
-    patched_post.assert_called_with("https://fake-host/fake-end-point", verify=True)
-    patched_put.assert_called_with("https://fake-host/fake-end-point", verify=True)
-    patched_delete.assert_called_with("https://fake-host/fake-end-point", verify=True)
+    patched_get.assert_called_with("https://fake-host/fake-end-point", verify=True, timeout=(10, 120))
+    patched_post.assert_called_with("https://fake-host/fake-end-point", verify=True, timeout=(10, 120))
+    patched_put.assert_called_with("https://fake-host/fake-end-point", verify=True, timeout=(10, 120))
+    patched_delete.assert_called_with("https://fake-host/fake-end-point", verify=True, timeout=(10, 120))
+
+
+def test_cgw_session_pool_settings():
+    cgw_session = CGWSession("https://fake-host", pool_connections=2, pool_maxsize=20, pool_block=True)
+
+    assert cgw_session.session.get_adapter("https://fake-host") is cgw_session.adapter
+    assert cgw_session.adapter._pool_connections == 2
+    assert cgw_session.adapter._pool_maxsize == 20
+    assert cgw_session.adapter._pool_block is True
+
+
+def test_cgw_session_pool_stats():
+    cgw_session = CGWSession("https://fake-host", pool_maxsize=1)
+    assert cgw_session.pool_stats() == {"opened": 0, "reused": 0, "discarded": 0}
+
+    pool = cgw_session.adapter.poolmanager.connection_from_url("https://fake-host")
+    first, second = pool._get_conn(), pool._new_conn()
+    pool.num_requests = 5
+    pool._put_conn(first)
+    pool._put_conn(second)
+
+    assert cgw_session.pool_stats() == {"opened": 2, "reused": 3, "discarded": 1}
+
+
+@patch("pubtools._content_gateway.cgw_session.time.monotonic", return_value=100)
+def test_cgw_session_deadline_caps_timeouts(patched_monotonic):
+    cgw_session = CGWSession("https://fake-host", connect_timeout=5, read_timeout=None)
+    assert cgw_session.request_timeout() == (5, None)
+
+    cgw_session.deadline = 130
+    assert cgw_session.request_timeout() == (5, 30)
+    cgw_session.deadline = 103
+    assert cgw_session.request_timeout() == (3, 3)
+
+
+@patch("requests.Session.get")
+@patch("pubtools._content_gateway.cgw_session.time.monotonic", return_value=100)
+def test_cgw_session_deadline_exceeded(patched_monotonic, patched_get):
+    cgw_session = CGWSession("https://fake-host")
+    cgw_session.deadline = 100
+
+    with pytest.raises(requests.exceptions.Timeout, match="CGW push deadline exceeded"):
+        cgw_session.get("/fake-end-point")
+    patched_get.assert_not_called()
+
+
+def test_cgw_session_retries_throttled_responses():
+    cgw_session = CGWSession("https://fake-host")
+    retry = cgw_session.adapter.max_retries
+
+    assert isinstance(retry, CGWRetry)
+    assert retry.limiter is cgw_session.limiter
+    assert retry.is_retry("GET", 429, has_retry_after=True)
+    assert retry.is_retry("GET", 503)
+
+
+@patch("pubtools._content_gateway.rate_limiter.random.random", return_value=1)
+def test_cgw_retry_reports_throttling(patched_random):
+    limiter = RateLimiter()
+    retry = CGWRetry(total=3, backoff_factor=2, status_forcelist=[429, 500], limiter=limiter, jitter=0.5)
+
+    retry = retry.increment("GET", "/products", response=HTTPResponse(status=500))
+    assert limiter.rate is None
+    retry = retry.increment("GET", "/products", response=HTTPResponse(status=429, headers={"Retry-After": "30"}))
+    assert limiter.rate == limiter.min_rate
+    assert limiter.paused_until > limiter.updated + 29
+
+    # the limiter and jitter are kept in the new retry objects
+    assert retry.limiter is limiter
+    assert retry.get_backoff_time() == 2
+
+
+@patch("pubtools._content_gateway.rate_limiter.time.sleep")
+@patch("requests.adapters.HTTPAdapter.send")
+def test_cgw_session_adapter_waits_for_limiter(patched_send, patched_sleep):
+    cgw_session = CGWSession("https://fake-host", rate_limit=1)
+    patched_send.return_value.status_code = 200
+
+    cgw_session.adapter.send("first request")
+    cgw_session.adapter.send("second request")
+
+    assert patched_send.call_count == 2
+    assert patched_sleep.call_count == 1
+    assert cgw_session.limiter.rate == 1
+
+
+@patch("pubtools._content_gateway.rate_limiter.time.sleep")
+@patch("requests.adapters.HTTPAdapter.send")
+def test_cgw_session_adapter_reports_throttled_responses(patched_send, patched_sleep):
+    cgw_session = CGWSession("https://fake-host")
+    patched_send.return_value.status_code = 429
+    patched_send.return_value.headers = {"Retry-After": "3600"}
+
+    # e.g. a POST request which urllib3 doesn't retry
+    cgw_session.adapter.send("request")
+
+    limiter = cgw_session.limiter
+    assert limiter.rate == limiter.min_rate
+    assert limiter.paused_until == pytest.approx(limiter.updated + BACKOFF_MAX)
+
+
+@patch("requests.adapters.HTTPAdapter.send")
+def test_cgw_session_adapter_caps_timeouts_after_wait(patched_send):
+    cgw_session = CGWSession("https://fake-host")
+    patched_send.return_value.status_code = 200
+    cgw_session.deadline = time.monotonic() + 5
+
+    cgw_session.adapter.send("request", timeout=(10, 120))
+    connect_timeout, read_timeout = patched_send.call_args.kwargs["timeout"]
+    assert 0 < connect_timeout <= 5
+    assert 0 < read_timeout <= 5
+
+    cgw_session.deadline = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout, match="CGW push deadline exceeded"):
+        cgw_session.adapter.send("request", timeout=(10, 120))
+    assert patched_send.call_count == 1
+
+
+def test_cgw_retry_caps_retry_after():
+    cgw_session = CGWSession("https://fake-host")
+    retry = cgw_session.adapter.max_retries
+    response = HTTPResponse(status=429, headers={"Retry-After": "3600"})
+
+    assert retry.get_retry_after(response) == BACKOFF_MAX
+    cgw_session.deadline = time.monotonic() + 5
+    assert 0 < retry.get_retry_after(response) <= 5
+
+    cgw_session.deadline = time.monotonic()
+    with patch("pubtools._content_gateway.cgw_session.CGWRetry.sleep_for_retry", return_value=True):
+        with pytest.raises(requests.exceptions.Timeout, match="CGW push deadline exceeded"):
+            retry.sleep(response)
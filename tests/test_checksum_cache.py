@@ -0,0 +1,48 @@
+import os
+
+from pubtools._content_gateway.checksum_cache import ChecksumCache
+
+CHECKSUMS = {"md5": "md5sum", "sha256": "sha256sum"}
+
+
+def test_checksum_cache(tmp_path):
+    file_path = tmp_path / "artifact.iso"
+    file_path.write_bytes(b"data")
+    cache = ChecksumCache(str(tmp_path / "cache"))
+    key = cache.key(str(file_path))
+
+    assert key[:2] == (os.path.realpath(str(file_path)), 4)
+    assert cache.get(key) is None
+    cache.put(key, CHECKSUMS)
+    assert cache.get(key) == dict(CHECKSUMS, size=4)
+
+    # a new cache in the same directory
+    cache.close()
+    assert ChecksumCache(str(tmp_path / "cache")).get(key) == dict(CHECKSUMS, size=4)
+
+
+def test_checksum_cache_changed_file(tmp_path):
+    file_path = tmp_path / "artifact.iso"
+    file_path.write_bytes(b"data")
+    cache = ChecksumCache(str(tmp_path))
+    key = cache.key(str(file_path))
+    cache.put(key, CHECKSUMS)
+
+    os.utime(str(file_path), ns=(0, key[2] + 1))
+    changed_key = cache.key(str(file_path))
+    assert changed_key != key
+    assert cache.get(changed_key) is None
+
+    cache.put(changed_key, {"md5": "new", "sha256": "new"})
+    # only the latest checksums of the path are kept
+    assert cache.get(key) is None
+    assert cache.get(changed_key) == {"md5": "new", "sha256": "new", "size": 4}
+
+
+def test_checksum_cache_missing_file(tmp_path):
+    cache = ChecksumCache(str(tmp_path))
+    key = cache.key(str(tmp_path / "missing"))
+
+    assert key is None
+    cache.put(key, CHECKSUMS)
+    assert cache.get(key) is None
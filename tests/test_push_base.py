@@ -1,6 +1,6 @@
 import requests_mock
 import pytest
-from pubtools._content_gateway.push_base import PushBase, CGWError, FetcherDict
+from pubtools._content_gateway.push_base import PushBase, CGWError, FetcherDict, PrefetchScopes
 from tests.fake_cgw_client import TestClient
 
 try:
@@ -193,6 +193,253 @@ class TestFetcherDict:
         del fetcher[key]
         assert key not in fetcher.data
 
+    def test_scope_fetched_once(self, push_base_object):
+        calls = []
+
+        def fake_product(product_name, product_code):
+            calls.append((product_name, product_code))
+            yield ("test_product_name", "test_product_code"), 1
+
+        fetcher = FetcherDict(
+            {}, fetcher=fake_product, key_checker=push_base_object._product_mapping_key_check, scope_size=0
+        )
+        assert fetcher.get(("test_product_name", "test_product_code")) == 1
+        assert fetcher.get(("missing", "missing")) is None
+        assert fetcher.get(("other", "other")) is None
+        assert calls == [("test_product_name", "test_product_code")]
+        assert fetcher.fetch_count == 1
+        assert fetcher.fetches_avoided == 2
+
+    def test_scope_per_parent(self, push_base_object):
+        calls = []
+
+        def fake_version(product_name, product_code, version_name):
+            calls.append((product_name, product_code))
+            return []
+
+        fetcher = FetcherDict(
+            {}, fetcher=fake_version, key_checker=push_base_object._product_version_mapping_key_check, scope_size=2
+        )
+        fetcher.get(("p1", "c1", "v1"))
+        fetcher.get(("p1", "c1", "v2"))
+        fetcher.get(("p2", "c2", "v1"))
+        assert calls == [("p1", "c1"), ("p2", "c2")]
+        with pytest.raises(KeyError):
+            fetcher[("p1", "c1", "v3")]
+        assert fetcher.fetches_avoided == 2
+
+    def test_mark_fetched(self, push_base_object):
+        fetcher = FetcherDict({}, fetcher=mock.MagicMock(), key_checker=push_base_object._file_key_check, scope_size=3)
+        fetcher.mark_fetched(("p1", "c1", "v1"))
+        assert fetcher.get(("p1", "c1", "v1", "/url")) is None
+        assert fetcher.fetcher.called is False
+
+    def test_no_scope_tracking(self, push_base_object):
+        fetcher = FetcherDict({}, fetcher=mock.MagicMock(return_value=[]), key_checker=lambda key: None)
+        fetcher.mark_fetched(())
+        fetcher.get(("a", "b"))
+        fetcher.get(("a", "b"))
+        assert fetcher.fetcher.call_count == 2
+        assert fetcher.fetches_avoided == 0
+
+    @mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+    def test_push_base_fetches_products_once(self, mocked_cgw_client, create_product_data, create_product2_data):
+        push_base = PushBase("http://fake_host_nmae/test", "foo", "bar")
+        get_products_calls = len(push_base.cgw_client.get_products.calls)
+        push_base.process_product(create_product_data)
+        push_base.process_product(create_product2_data)
+        assert len(push_base.cgw_client.get_products.calls) == get_products_calls + 1
+        assert push_base.product_mapping.fetches_avoided == 1
+
+    @mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+    def test_created_parents_skip_child_listing(self, mocked_cgw_client):
+        push_base = PushBase("http://fake_host_nmae/test", "foo", "bar")
+        get_versions_calls = len(push_base.cgw_client.get_versions.calls)
+        get_files_calls = len(push_base.cgw_client.get_files.calls)
+        push_base.process_product(
+            {
+                "type": "product",
+                "action": "create",
+                "metadata": {"name": "new_product", "productCode": "new_code", "eloquaCode": "NOT_SET"},
+            }
+        )
+        push_base.process_version(
+            {
+                "type": "product_version",
+                "action": "create",
+                "metadata": {
+                    "productName": "new_product",
+                    "productCode": "new_code",
+                    "versionName": "new_version",
+                    "termsAndConditions": "Anonymous Download",
+                },
+            }
+        )
+        push_base.process_file(
+            {
+                "type": "file",
+                "action": "create",
+                "metadata": {
+                    "productName": "new_product",
+                    "productCode": "new_code",
+                    "productVersionName": "new_version",
+                    "downloadURL": "/content/origin/new_file",
+                },
+            }
+        )
+        assert len(push_base.cgw_client.get_versions.calls) == get_versions_calls
+        assert len(push_base.cgw_client.get_files.calls) == get_files_calls
+        assert len(push_base.completed_operations) == 3
+
+    @mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+    def test_renamed_records_found_by_new_name(self, mocked_cgw_client):
+        push_base = PushBase("http://fake_host_nmae/test", "foo", "bar")
+        pid = push_base.process_product(
+            {"type": "product", "action": "create", "metadata": {"name": "old", "productCode": "code"}}
+        )
+        push_base.process_version(
+            {
+                "type": "product_version",
+                "action": "create",
+                "metadata": {"productName": "old", "productCode": "code", "versionName": "v1"},
+            }
+        )
+        vid = push_base.pv_mapping.get(("old", "code", "v1"))
+
+        # renamed via id, then a child is created under the new name
+        push_base.process_product(
+            {"type": "product", "action": "update", "metadata": {"id": pid, "name": "new", "productCode": "code"}}
+        )
+        push_base.process_version(
+            {
+                "type": "product_version",
+                "action": "update",
+                "metadata": {"id": vid, "productName": "new", "productCode": "code", "versionName": "v2"},
+            }
+        )
+        push_base.process_file(
+            {
+                "type": "file",
+                "action": "create",
+                "metadata": {
+                    "productName": "new",
+                    "productCode": "code",
+                    "productVersionName": "v2",
+                    "downloadURL": "/content/file",
+                },
+            }
+        )
+        push_base.process_version(
+            {
+                "type": "product_version",
+                "action": "create",
+                "metadata": {"productName": "new", "productCode": "code", "versionName": "v3"},
+            }
+        )
+
+        assert push_base.product_mapping.get(("new", "code")) == pid
+        assert push_base.product_mapping.get(("old", "code")) is None
+        assert push_base.pv_mapping.get(("new", "code", "v2")) == vid
+        assert push_base.file_mapping.get(("new", "code", "v2", "/content/file"))
+        assert [item["action"] for item in push_base.completed_operations] == [
+            "create",
+            "create",
+            "update",
+            "update",
+            "create",
+            "create",
+        ]
+
+
+class TestPrefetch:
+    @pytest.fixture()
+    @mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+    def push_base_object(self, mocked_cgw_client):
+        push_base = PushBase("http://fake_host_nmae/test", "foo", "bar", workers=4)
+        client = push_base.cgw_client
+        for product_index in range(2):
+            pid = client.create_product({"name": "p%s" % product_index, "productCode": "code"})
+            for version_index in range(2):
+                vid = client.create_version(pid, {"versionName": "v%s" % version_index})
+                client.create_file(pid, vid, {"downloadURL": "/p%s/v%s/file" % (product_index, version_index)})
+        return push_base
+
+    @staticmethod
+    def file_item(product_name, version_name, url):
+        return {
+            "type": "file",
+            "action": "create",
+            "metadata": {
+                "productName": product_name,
+                "productCode": "code",
+                "productVersionName": version_name,
+                "downloadURL": url,
+            },
+        }
+
+    def test_prefetch_fills_mappings(self, push_base_object):
+        items = [
+            self.file_item("p%s" % product_index, "v%s" % version_index, "/new")
+            for product_index in range(2)
+            for version_index in range(2)
+        ]
+        items.append(self.file_item("missing", "v0", "/new"))
+        client = push_base_object.cgw_client
+        get_versions_calls = len(client.get_versions.calls)
+        get_files_calls = len(client.get_files.calls)
+
+        push_base_object.prefetch(items)
+
+        assert len(client.get_versions.calls) == get_versions_calls + 2
+        assert len(client.get_files.calls) == get_files_calls + 4
+        assert push_base_object.file_mapping.get(("p1", "code", "v1", "/p1/v1/file"))
+        assert len(push_base_object.product_records) == 2
+        assert len(push_base_object.version_records) == 4
+        assert len(push_base_object.file_records) == 4
+
+        push_base_object.process_items(items[:-1])
+
+        assert len(client.get_versions.calls) == get_versions_calls + 2
+        assert len(client.get_files.calls) == get_files_calls + 4
+        assert len(push_base_object.completed_operations) == 4
+
+    def test_process_items_prefetch_argument(self, push_base_object):
+        items = [self.file_item("p0", "v%s" % version_index, "/new") for version_index in range(2)]
+
+        with mock.patch.object(push_base_object, "prefetch") as prefetch:
+            with mock.patch("pubtools._content_gateway.push_base.OperationScheduler"):
+                push_base_object.process_items(items)
+                prefetch.assert_not_called()
+
+                push_base_object.process_items(items, prefetch=True)
+                prefetch.assert_called_once_with(items)
+
+    def test_prefetch_scopes_collected_while_reading(self):
+        scopes = PrefetchScopes()
+        items = [
+            {"type": "product", "metadata": {"name": "p0", "productCode": "code"}},
+            self.file_item("p0", "v0", "/a"),
+            self.file_item("p0", "v0", "/b"),
+            self.file_item("p1", "v0", "/c"),
+            {"type": "unknown"},
+        ]
+
+        assert list(scopes.collect(iter(items))) == items
+        assert scopes.product_keys == {("p0", "code"), ("p1", "code")}
+        assert scopes.version_scopes == {("p0", "code"): ("p0", "code", "v0"), ("p1", "code"): ("p1", "code", "v0")}
+        assert scopes.file_scopes == {
+            ("p0", "code", "v0"): ("p0", "code", "v0", "/a"),
+            ("p1", "code", "v0"): ("p1", "code", "v0", "/c"),
+        }
+
+    def test_prefetch_failure_is_not_fatal(self, push_base_object):
+        push_base_object.cgw_client = mock.MagicMock()
+        push_base_object.cgw_client.get_products.side_effect = CGWError("listing failed")
+
+        push_base_object.prefetch([self.file_item("p0", "v0", "/new")])
+
+        assert push_base_object.cgw_client.get_versions.called is False
+
 
 class TestRollbackOperations:
     @pytest.fixture()
@@ -351,6 +598,62 @@ class TestRollbackOperations:
             push_base_object.rollback_cgw_operation()
             assert m.call_count == 1
 
+    def test_rollback_order_and_report(self, push_base_object):
+        push_base_object.workers = 4
+        push_base_object.completed_operations = [
+            {"type": "product", "action": "create", "product_id": 1111, "metadata": {}},
+            {
+                "type": "product_version",
+                "action": "create",
+                "version_id": 2222,
+                "metadata": {"productId": 1111},
+            },
+        ] + [
+            {
+                "type": "file",
+                "action": "create",
+                "product_id": 1111,
+                "file_id": file_id,
+                "metadata": {"productVersionId": 2222},
+            }
+            for file_id in (1, 2, 3)
+        ]
+        with requests_mock.Mocker() as m:
+            m.register_uri("DELETE", "mock://test.com/products/1111/versions/2222/files/1", status_code=200)
+            m.register_uri("DELETE", "mock://test.com/products/1111/versions/2222/files/2", status_code=500)
+            m.register_uri("DELETE", "mock://test.com/products/1111/versions/2222/files/3", status_code=200)
+            m.register_uri("DELETE", "mock://test.com/products/1111/versions/2222", status_code=400)
+            m.register_uri("DELETE", "mock://test.com/products/1111", status_code=200)
+            report = push_base_object.rollback_cgw_operation()
+
+            paths = [request.path for request in m.request_history]
+            assert sorted(paths[:3]) == ["/products/1111/versions/2222/files/%s" % file_id for file_id in (1, 2, 3)]
+            assert paths[3:] == ["/products/1111/versions/2222", "/products/1111"]
+
+        assert report == push_base_object.rollback_report
+        assert [(entry["type"], entry["id"], entry["status"]) for entry in report] == [
+            ("file", 3, "done"),
+            ("file", 2, "failed"),
+            ("file", 1, "done"),
+            ("product_version", 2222, "failed"),
+            ("product", 1111, "done"),
+        ]
+        assert "status_code: 500" in report[1]["error"]
+
+    def test_rollback_record_operations_in_reverse_order(self, push_base_object):
+        push_base_object.workers = 4
+        push_base_object.completed_operations = [
+            {"type": "product", "action": "create", "product_id": 1111, "metadata": {}},
+            {"type": "product", "action": "update", "metadata": {"id": 1111}},
+        ]
+        with requests_mock.Mocker() as m:
+            m.register_uri("POST", "mock://test.com/products", status_code=400)
+            m.register_uri("DELETE", "mock://test.com/products/1111", status_code=200)
+            report = push_base_object.rollback_cgw_operation()
+            assert [request.method for request in m.request_history] == ["POST", "DELETE"]
+
+        assert [(entry["action"], entry["status"]) for entry in report] == [("update", "failed"), ("create", "done")]
+
 
 class TestMakeVisible:
     @pytest.fixture()
@@ -409,3 +712,146 @@ class TestMakeVisible:
             )
             push_base_object.make_visible()
             assert m.call_count == 1
+
+    def test_make_visible_aggregates_errors(self, push_base_object):
+        push_base_object.workers = 4
+        version = {
+            "type": "product_version",
+            "action": "create",
+            "version_id": 2222,
+            "metadata": {"productId": 1111, "versionName": "AnsibleNewTestVersion 1"},
+        }
+        files = [
+            {
+                "type": "file",
+                "action": "create",
+                "product_id": 1111,
+                "file_id": file_id,
+                "metadata": {"downloadURL": "/content/origin/test%s" % file_id, "productVersionId": 2222},
+            }
+            for file_id in range(3)
+        ]
+        push_base_object.completed_operations = [version] + files
+        with requests_mock.Mocker() as m:
+            m.register_uri(
+                "POST",
+                "mock://test.com/products/1111/versions/2222/files",
+                [{"status_code": 200}, {"status_code": 400}, {"status_code": 400}],
+            )
+            m.register_uri("POST", "mock://test.com/products/1111/versions", status_code=200)
+            with pytest.raises(CGWError) as exception:
+                push_base_object.make_visible()
+
+            assert m.call_count == 3
+            assert all(request.path.endswith("/files") for request in m.request_history)
+        assert "Failed to update the invisible attribute of 2 out of 3 records" in str(exception.value)
+        assert push_base_object.completed_operations == [version] + files
+
+    def test_make_visible_versions_after_files(self, push_base_object):
+        push_base_object.workers = 4
+        push_base_object.completed_operations = [
+            {
+                "type": "product_version",
+                "action": "create",
+                "version_id": 2222,
+                "metadata": {"productId": 1111, "invisible": True},
+            },
+            {
+                "type": "file",
+                "action": "create",
+                "product_id": 1111,
+                "file_id": 333,
+                "metadata": {"productVersionId": 2222},
+            },
+        ]
+        with requests_mock.Mocker() as m:
+            m.register_uri("POST", "mock://test.com/products/1111/versions/2222/files", status_code=200)
+            m.register_uri("POST", "mock://test.com/products/1111/versions", status_code=200)
+            push_base_object.make_visible()
+            assert [request.path for request in m.request_history] == [
+                "/products/1111/versions/2222/files",
+                "/products/1111/versions",
+            ]
+            assert m.request_history[1].json()["invisible"] is True
+
+
+class TestDeadline:
+    @staticmethod
+    def new_push_base(**kwargs):
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            return PushBase("http://fake_host_nmae/test", "foo", "bar", **kwargs)
+
+    def test_no_deadline(self):
+        push_base = self.new_push_base()
+        push_base.start_deadline()
+        push_base.check_deadline()
+        assert push_base._deadline_at is None
+
+    def test_deadline_passed_to_client(self):
+        push_base = self.new_push_base(deadline=30)
+        push_base.start_deadline()
+        assert push_base.cgw_client.deadline == 30
+        push_base.clear_deadline()
+        assert push_base.cgw_client.deadline is None
+
+    def test_deadline_exceeded_stops_operations(self, create_product_data):
+        push_base = self.new_push_base(deadline=30)
+        created = len(push_base.cgw_client.create_product.calls)
+        with mock.patch("pubtools._content_gateway.push_base.time.monotonic", return_value=100):
+            push_base.start_deadline()
+        with mock.patch("pubtools._content_gateway.push_base.time.monotonic", return_value=130):
+            with pytest.raises(CGWError) as exception:
+                push_base.process_items([create_product_data])
+
+        assert str(exception.value) == "CGW push deadline of 30 seconds exceeded"
+        assert len(push_base.cgw_client.create_product.calls) == created
+
+    def test_failed_request_after_deadline_reports_deadline(self, create_product_data):
+        push_base = self.new_push_base(deadline=30)
+        times = iter([100, 110, 131])
+        with mock.patch("pubtools._content_gateway.push_base.time.monotonic", side_effect=lambda: next(times)):
+            push_base.start_deadline()
+            with mock.patch.object(push_base, "process_product", side_effect=Exception("read timeout")):
+                with pytest.raises(CGWError) as exception:
+                    push_base.process_items([create_product_data])
+
+        assert str(exception.value) == "CGW push deadline of 30 seconds exceeded"
+        assert str(exception.value.__context__) == "read timeout"
+
+    def test_rollback_clears_deadline(self):
+        push_base = self.new_push_base(deadline=0)
+        push_base.start_deadline()
+        with pytest.raises(CGWError):
+            push_base.make_visible()
+        assert push_base.rollback_cgw_operation() == []
+        assert push_base.cgw_client.deadline is None
+        push_base.check_deadline()
+
+
+def test_fork_keeps_own_operation_log(push_base_object):
+    push_base_object.completed_operations = [{"type": "product", "action": "create"}]
+    fork = push_base_object.fork()
+
+    assert fork.completed_operations == []
+    assert fork.rollback_report == []
+    assert fork._operations_lock is not push_base_object._operations_lock
+    assert fork.cgw_client is push_base_object.cgw_client
+    assert fork.product_mapping is push_base_object.product_mapping
+    assert fork.pv_mapping is push_base_object.pv_mapping
+    assert fork.file_mapping is push_base_object.file_mapping
+
+
+def test_validate_cgw_items(push_base_object):
+    valid = {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": "c", "eloquaCode": 1}}
+    invalid = {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": "c"}}
+
+    push_base_object.validate_cgw_items([("first.yaml", [valid]), ("second.yaml", [valid])])
+
+    with pytest.raises(CGWError) as exception:
+        push_base_object.validate_cgw_items([("first.yaml", [invalid, valid]), ("second.yaml", [valid, invalid])])
+
+    assert str(exception.value) == (
+        "2 out of 4 CGW items are invalid:\n"
+        "first.yaml item 0 (product c): metadata: 'eloquaCode' is a required property\n"
+        "second.yaml item 1 (product c): metadata: 'eloquaCode' is a required property"
+    )
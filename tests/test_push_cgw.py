@@ -1,7 +1,9 @@
 import os
 import argparse
 import pytest
+import yaml
 from pubtools._content_gateway.push_cgw import PushCGW, main
+from pubtools._content_gateway.utils import yaml_items
 from tests.fake_cgw_client import TestClient
 
 try:
@@ -28,7 +30,7 @@ def test_cgw_operations(mocked_cgw_client):
     assert mocked_cgw_client.called is True
 
 
-@mock.patch("pubtools._content_gateway.push_cgw.yaml_parser")
+@mock.patch("pubtools._content_gateway.push_cgw.yaml_items")
 @mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
 @mock.patch(
     "pubtools._content_gateway.push_cgw.argparse.ArgumentParser.parse_args",
@@ -37,16 +39,73 @@ def test_cgw_operations(mocked_cgw_client):
         CGW_username="test_username",
         CGW_password="**********",
         CGW_filepath=yaml_file_path,
+        CGW_workers=1,
+        CGW_pool_connections=10,
+        CGW_pool_maxsize=None,
+        CGW_pool_block=False,
+        CGW_connect_timeout=10,
+        CGW_read_timeout=120,
+        CGW_rate_limit=None,
+        CGW_deadline=None,
+        CGW_validation_workers=1,
     ),
 )
-def test_main(mock_args, mock_cgw, mock_yaml_parser, create_product_data):
-    mock_yaml_parser.return_value = [create_product_data]
+def test_main(mock_args, mock_cgw, mock_yaml_items, create_product_data):
+    mock_yaml_items.side_effect = lambda path: iter([create_product_data])
     main()
     expected_product_id = 1
     assert expected_product_id in mock_cgw.return_value.products
     assert mock_args.called is True
 
 
+@mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+def test_cgw_operations_concurrent(mocked_cgw_client):
+    push_cgw = PushCGW("http://fake_host_name/test", "foo", "bar", yaml_file_path, workers=4)
+    create_file_calls = len(push_cgw.cgw_client.create_file.calls)
+    with mock.patch("pubtools._content_gateway.push_cgw.yaml_items", wraps=yaml_items) as parsed:
+        push_cgw.cgw_operations()
+
+    assert len(push_cgw.cgw_client.create_file.calls) > create_file_calls
+    assert push_cgw.completed_operations
+    # the prefetched scopes are collected while validating
+    assert parsed.call_count == 2
+
+
+def version_item(product):
+    return {
+        "type": "product_version",
+        "action": "create",
+        "metadata": {
+            "productName": product,
+            "productCode": product,
+            "versionName": "1.0",
+            "termsAndConditions": "Anonymous Download",
+        },
+    }
+
+
+@mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient())
+def test_cgw_operations_existing_parents_not_waited_for(mocked_cgw_client, tmp_path):
+    product = {
+        "type": "product",
+        "action": "create",
+        "metadata": {"name": "New", "productCode": "New", "eloquaCode": "NOT_SET"},
+    }
+    path = tmp_path / "cgw.yaml"
+    path.write_text(yaml.safe_dump([version_item("Existing"), product, version_item("New")]))
+    push_cgw = PushCGW("http://fake_host_name/test", "foo", "bar", str(path))
+
+    with mock.patch.object(PushCGW, "process_items") as processed, mock.patch.object(PushCGW, "make_visible"):
+        push_cgw.cgw_operations()
+
+    # the version of the product not created by the file isn't held until all the items are read
+    assert [item["metadata"].get("productName") for item in processed.call_args.args[0]] == [
+        "Existing",
+        None,
+        "New",
+    ]
+
+
 def test_cgw_operations_exception():
     push_cgw = PushCGW("http://fake_host_name/test", "foo", "bar", yaml_file_path)
     push_cgw.process_product = []
@@ -72,6 +131,15 @@ def mock_cgw_password():
         CGW_username="test_username",
         CGW_password=None,
         CGW_filepath=yaml_file_path,
+        CGW_workers=1,
+        CGW_pool_connections=10,
+        CGW_pool_maxsize=None,
+        CGW_pool_block=False,
+        CGW_connect_timeout=10,
+        CGW_read_timeout=120,
+        CGW_rate_limit=None,
+        CGW_deadline=None,
+        CGW_validation_workers=1,
     ),
 )
 def test_main_with_env_var_password(mock_args, mock_push_cgw, mock_cgw_password):
@@ -79,7 +147,19 @@ def test_main_with_env_var_password(mock_args, mock_push_cgw, mock_cgw_password)
     main()
 
     mock_push_cgw.assert_called_once_with(
-        "http://fake_host_name/test", "test_username", "test_password_from_env", yaml_file_path
+        "http://fake_host_name/test",
+        "test_username",
+        "test_password_from_env",
+        yaml_file_path,
+        workers=1,
+        pool_connections=10,
+        pool_maxsize=None,
+        pool_block=False,
+        connect_timeout=10,
+        read_timeout=120,
+        rate_limit=None,
+        deadline=None,
+        validation_workers=1,
     )
 
     assert mock_args.called is True
@@ -93,6 +173,15 @@ def test_main_with_env_var_password(mock_args, mock_push_cgw, mock_cgw_password)
         CGW_username="test_username",
         CGW_password=None,
         CGW_filepath=yaml_file_path,
+        CGW_workers=1,
+        CGW_pool_connections=10,
+        CGW_pool_maxsize=None,
+        CGW_pool_block=False,
+        CGW_connect_timeout=10,
+        CGW_read_timeout=120,
+        CGW_rate_limit=None,
+        CGW_deadline=None,
+        CGW_validation_workers=1,
     ),
 )
 def test_main_fail_without_password(mock_args, mock_push_cgw, capfd):
@@ -1,9 +1,22 @@
-from pubtools._content_gateway.push_staged_cgw import PushStagedCGW, entry_point
+from pubtools._content_gateway.push_staged_cgw import (
+    PulpUnitRecord,
+    PushItemEntry,
+    PushItemIndex,
+    PushStagedCGW,
+    entry_point,
+    push_item_key,
+)
 import pytest
+import yaml
+from pubtools._content_gateway.scheduler import group_related
+from pubtools._content_gateway.utils import file_checksums, format_cgw_items, yaml_items, yaml_parser
 from tests.fake_cgw_client import TestClient
 import os
-from pushsource import CGWPushItem, FilePushItem, DirectoryPushItem
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pushsource import CGWPushItem, FilePushItem, DirectoryPushItem, Source
+from pubtools.pluggy import pm
+from pubtools._content_gateway.push_base import CGWError
 
 from tests.conftest import test_staging_dir, test_staging_dir_raw
 
@@ -31,6 +44,11 @@ class Struct:
         self.__dict__.update(entries)
 
 
+def source_items(source_url):
+    with Source.get(source_url) as source:
+        return list(source)
+
+
 def get_pulp_push_item():
     pulp_push_item = {
         "repository_memberships": "test",
@@ -71,9 +89,8 @@ def get_pulp_push_item():
 def test_cgw_operations_success(mocked_cgw_client, target_setting, fixture_source_stage):
     pulp_push_item = get_pulp_push_item()
     push_cgw = PushStagedCGW(["staged:%s" % test_staging_dir()], "fake_target_name", target_setting)
-    for item in push_cgw.push_items:
-        push_cgw.pulp_push_units[push_cgw.push_item_str(item)] = pulp_push_item
-        push_cgw.processed_push_items[push_cgw.push_item_str(item)] = item
+    for item in source_items("staged:%s" % test_staging_dir()):
+        push_cgw.pulp_item_push_finished([pulp_push_item], item)
     push_cgw.push_staged_operations()
 
     assert len(push_cgw.cgw_client.create_product.calls) >= 1
@@ -133,9 +150,8 @@ def test_cgw_operations_success_raw(mocked_cgw_client, target_setting, fixture_s
 def test_invalid_push_items(mocked_cgw_client, target_setting, fixture_source_stage):
     pulp_push_item = get_pulp_push_item()
     push_cgw = PushStagedCGW(["stage:%s" % test_staging_dir()], "fake_target_name", target_setting)
-    for item in push_cgw.push_items:
-        push_cgw.processed_push_items[json.dumps(repr(item), sort_keys=True)] = item
-        push_cgw.pulp_push_units[json.dumps(repr(item), sort_keys=True)] = pulp_push_item
+    for item in source_items("stage:%s" % test_staging_dir()):
+        push_cgw.pulp_item_push_finished([pulp_push_item], item)
 
     push_cgw.rollback_cgw_operation = mock.MagicMock()
 
@@ -182,16 +198,490 @@ def test_pulp_item_push_finished_success(target_setting, fixture_source_stage):
     push_cgw = PushStagedCGW(["stage:%s" % test_staging_dir()], "fake_target_name", target_setting)
 
     push_cgw.pulp_item_push_finished([pulp_push_item], cgw_item)
-    assert push_cgw.push_items == [
-        FilePushItem(
-            name="dummy-1.0.0-0.x86_64.rpm",
-            src="%s/repo_invalid/RPMS/dummy-1.0.0-0.x86_64.rpm" % test_staging_dir(),
-            origin="",
-        ),
+    assert push_cgw.push_item_index.count == 2
+    assert push_cgw.push_item_index.cgw_push_items == [
         CGWPushItem(
             name="cgw_push.yaml",
             src="%s/repo1/CGW/cgw.yaml" % test_staging_dir(),
             origin="",
         ),
     ]
-    assert push_cgw.push_item_str(cgw_item) in push_cgw.pulp_push_units
+    assert push_cgw.push_item_index.paths == {
+        "%s/repo_invalid/RPMS/dummy-1.0.0-0.x86_64.rpm"
+        % test_staging_dir().lstrip("/"): PushItemEntry(0, push_item_key(cgw_item), False)
+    }
+    assert push_cgw.pulp_push_units[push_item_key(cgw_item)] == PulpUnitRecord(
+        cdn_path="test", sha256sum="test", md5sum=None
+    )
+
+
+@pytest.mark.parametrize(
+    "fixture_source_stage",
+    [
+        [
+            FilePushItem(name="a", src="/origin/files/a", origin="/origin"),
+            DirectoryPushItem(name="raw", src="/origin/raw", origin="/origin"),
+            FilePushItem(name="b", src="/origin/files/b", origin="/origin"),
+            FilePushItem(name="a-copy", src="/origin/files/a", origin="/origin"),
+        ]
+    ],
+    indirect=True,
+)
+def test_find_push_item(target_setting, fixture_source_stage):
+    push_cgw = PushStagedCGW(["stage:"], "fake_target_name", target_setting)
+
+    assert sorted(push_cgw.push_item_index.paths) == ["files/a", "files/b"]
+    # the first push item with the path
+    assert push_cgw.find_push_item("files/a").name == "a"
+    # unless a directory push item precedes it
+    assert push_cgw.find_push_item("files/b").name == "raw"
+    assert push_cgw.find_push_item("files/missing").name == "raw"
+
+    push_cgw.push_item_index.directory = None
+    assert push_cgw.find_push_item("files/b").name == "b"
+    assert push_cgw.find_push_item("files/missing") is None
+
+
+def test_push_item_index_without_origin():
+    index = PushItemIndex()
+    index.add(FilePushItem(name="a", src="files/a", origin=None))
+
+    assert index.find("files/a") == PushItemEntry(0, push_item_key(FilePushItem(name="a", src="files/a")), False)
+
+
+def test_push_item_key_ignores_checksums():
+    item = FilePushItem(name="a", src="/origin/files/a", dest=["repo"], origin="/origin")
+    pushed = FilePushItem(
+        name="a", src="/origin/files/a", dest=["repo"], origin="/origin", md5sum="d41d8cd98f00b204e9800998ecf8427e"
+    )
+
+    assert push_item_key(item) == push_item_key(pushed)
+    assert push_item_key(item) != push_item_key(
+        FilePushItem(name="a", src="/origin/files/a", dest=["other-repo"], origin="/origin")
+    )
+
+
+@pytest.mark.parametrize(
+    "fixture_source_stage",
+    [
+        [
+            DirectoryPushItem(
+                name="origin",
+                src="%s/origin/RAW" % test_staging_dir_raw(),
+                origin="",
+            ),
+        ],
+    ],
+    indirect=True,
+)
+def test_directory_checksums_computed_up_front(target_setting, fixture_source_stage):
+    push_cgw = PushStagedCGW(["stage:"], "fake_target_name", dict(target_setting, checksum_workers=2))
+    items = format_cgw_items(yaml_parser("%s/origin/CGW/cgw.yaml" % test_staging_dir_raw()))
+    file_path = "%s/origin/RAW/dummy.txt" % test_staging_dir_raw()
+
+    assert push_cgw.directory_files(items + items) == [file_path]
+    push_cgw.start_checksums(items)
+    try:
+        assert push_cgw._checksum_executor._max_workers == 2
+        # forking the threads of the push may deadlock
+        assert push_cgw._checksum_executor._mp_context.get_start_method() != "fork"
+        assert push_cgw._checksums[file_path].result() == file_checksums(file_path)
+    finally:
+        push_cgw.stop_checksums()
+    assert push_cgw._checksum_executor is None
+    assert push_cgw._checksums == {}
+
+
+@pytest.mark.parametrize(
+    "fixture_source_stage",
+    [
+        [
+            DirectoryPushItem(
+                name="origin",
+                src="%s/origin/RAW" % test_staging_dir_raw(),
+                origin="",
+            ),
+        ],
+    ],
+    indirect=True,
+)
+def test_directory_checksums_cached(target_setting, fixture_source_stage, tmp_path):
+    settings = dict(target_setting, checksum_cache_dir=str(tmp_path))
+    items = format_cgw_items(yaml_parser("%s/origin/CGW/cgw.yaml" % test_staging_dir_raw()))
+    file_path = "%s/origin/RAW/dummy.txt" % test_staging_dir_raw()
+
+    push_cgw = PushStagedCGW(["stage:"], "fake_target_name", settings)
+    push_cgw.start_checksums(items)
+    assert push_cgw.directory_file_checksums(file_path) == file_checksums(file_path)
+    push_cgw.stop_checksums()
+
+    # the next push finds the checksums in the cache
+    push_cgw = PushStagedCGW(["stage:"], "fake_target_name", settings)
+    with mock.patch("pubtools._content_gateway.push_staged_cgw.ProcessPoolExecutor") as executor:
+        push_cgw.start_checksums(items)
+        assert push_cgw.directory_file_checksums(file_path) == file_checksums(file_path)
+    executor.assert_not_called()
+    push_cgw.stop_checksums()
+
+
+def test_load_sources_concurrently(target_setting):
+    sources = {
+        "first": [
+            FilePushItem(name="a", src="/origin/files/a", origin="/origin"),
+            CGWPushItem(name="first.yaml", src="/origin/first.yaml", origin="/origin"),
+        ],
+        "second": [
+            FilePushItem(name="a-copy", src="/origin/files/a", origin="/origin"),
+            DirectoryPushItem(name="raw", src="/origin/raw", origin="/origin"),
+            FilePushItem(name="b", src="/origin/files/b", origin="/origin"),
+            CGWPushItem(name="second.yaml", src="/origin/second.yaml", origin="/origin"),
+        ],
+    }
+    for name, items in sources.items():
+        Source.register_backend(name, lambda items=items: items)
+    try:
+        with mock.patch(
+            "pubtools._content_gateway.push_staged_cgw.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as executor:
+            push_cgw = PushStagedCGW(["first:", "second:"], "fake_target_name", target_setting)
+    finally:
+        Source.reset()
+
+    executor.assert_called_once_with(max_workers=2)
+    index = push_cgw.push_item_index
+    assert index.count == 6
+    assert [item.name for item in index.cgw_push_items] == ["first.yaml", "second.yaml"]
+    # positions continue across the sources
+    assert index.find("files/a") == PushItemEntry(0, push_item_key(sources["first"][0]), False)
+    assert index.directory.position == 3
+    assert push_cgw.find_push_item("files/b").name == "raw"
+
+
+def write_cgw_yaml(directory, name, product, version_product=None):
+    items = [
+        {
+            "type": "product",
+            "action": "create",
+            "metadata": {"name": product, "productCode": product, "eloquaCode": "NOT_SET"},
+        },
+        {
+            "type": "product_version",
+            "action": "create",
+            "metadata": {
+                "productName": version_product or product,
+                "productCode": version_product or product,
+                "versionName": "1.0",
+                "termsAndConditions": "Anonymous Download",
+            },
+        },
+    ]
+    path = directory / name
+    path.write_text(yaml.safe_dump(items))
+    return CGWPushItem(name=name, src=str(path), origin="")
+
+
+def test_cgw_push_items_processed_concurrently(target_setting, tmp_path):
+    cgw_push_items = [
+        write_cgw_yaml(tmp_path, "first.yaml", "First"),
+        write_cgw_yaml(tmp_path, "second.yaml", "Second"),
+    ]
+    Source.register_backend("stage", lambda: cgw_push_items)
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            push_cgw = PushStagedCGW(["stage:"], "fake_target_name", dict(target_setting, item_workers=2))
+    finally:
+        Source.reset()
+
+    barrier = threading.Barrier(2, timeout=5)
+    process_items = push_cgw.process_items
+
+    def wait_for_each_other(self, items, process_file=None, prefetch=False):
+        barrier.wait()
+        return process_items.__func__(self, items, process_file=process_file, prefetch=prefetch)
+
+    with mock.patch.object(PushStagedCGW, "process_items", wait_for_each_other):
+        push_cgw.push_staged_operations()
+
+    assert push_cgw.completed_operations == []
+    assert [[item["type"] for item in operations] for operations in push_cgw.cgw_item_operations] == [
+        ["product", "product_version"],
+        ["product", "product_version"],
+    ]
+    assert [operations[0]["metadata"]["name"] for operations in push_cgw.cgw_item_operations] == ["First", "Second"]
+
+
+@pytest.mark.parametrize(
+    "settings,pool_maxsize",
+    [
+        ({}, 10),
+        ({"workers": 4, "item_workers": 3}, 12),
+        ({"workers": 4, "item_workers": 3, "overlapped": True}, 16),
+        ({"workers": 4, "item_workers": 3, "pool_maxsize": 5}, 5),
+    ],
+)
+def test_pool_sized_for_concurrent_requests(target_setting, settings, pool_maxsize):
+    Source.register_backend("stage", lambda: [])
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient") as client:
+            PushStagedCGW(["stage:"], "fake_target_name", dict(target_setting, **settings))
+    finally:
+        Source.reset()
+
+    assert client.call_args.kwargs["pool_maxsize"] == pool_maxsize
+
+
+def test_parse_cgw_push_items_once(target_setting, tmp_path):
+    cgw_push_item = write_cgw_yaml(tmp_path, "cgw.yaml", "New")
+    items = yaml.safe_load((tmp_path / "cgw.yaml").read_text())
+    existing = dict(items[1], metadata=dict(items[1]["metadata"], productName="Existing", productCode="Existing"))
+    (tmp_path / "cgw.yaml").write_text(yaml.safe_dump([existing] + items))
+    Source.register_backend("stage", lambda: [cgw_push_item])
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            push_cgw = PushStagedCGW(["stage:"], "fake_target_name", target_setting)
+    finally:
+        Source.reset()
+
+    with mock.patch("pubtools._content_gateway.push_staged_cgw.yaml_items", wraps=yaml_items) as parsed:
+        (sorted_items,) = push_cgw.parse_cgw_push_items()
+
+    assert parsed.call_count == 1
+    # the version of the product not created by the CGW push item doesn't wait for it
+    assert sorted_items == [existing] + items
+
+
+def test_failed_cgw_push_item_rolls_back_its_operations(target_setting, tmp_path):
+    cgw_push_items = [
+        write_cgw_yaml(tmp_path, "first.yaml", "First"),
+        write_cgw_yaml(tmp_path, "second.yaml", "Second", version_product="Missing"),
+    ]
+    Source.register_backend("stage", lambda: cgw_push_items)
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            push_cgw = PushStagedCGW(["stage:"], "fake_target_name", dict(target_setting, item_workers=2))
+    finally:
+        Source.reset()
+
+    with pytest.raises(Exception):
+        push_cgw.push_staged_operations()
+
+    first, second = push_cgw.cgw_item_operations
+    assert [item["type"] for item in first] == ["product", "product_version"]
+    # the product created by the failed CGW push item is deleted, the other one is kept
+    products = {product["name"] for product in push_cgw.cgw_client.products.values()}
+    assert "First" in products
+    assert "Second" not in products
+
+
+def overlapped_push(target_setting, tmp_path, version_product="Overlapped"):
+    (tmp_path / "files").mkdir()
+    (tmp_path / "files" / "a").write_text("a")
+    file_push_item = FilePushItem(name="a", src=str(tmp_path / "files" / "a"), origin=str(tmp_path))
+    cgw_push_item = write_cgw_yaml(tmp_path, "cgw.yaml", "Overlapped", version_product=version_product)
+    items = yaml.safe_load((tmp_path / "cgw.yaml").read_text())
+    file_metadata = {
+        "productName": "Overlapped",
+        "productCode": "Overlapped",
+        "productVersionName": "1.0",
+        "description": "test",
+        "label": "test",
+        "order": 0,
+        "hidden": False,
+        "invisible": False,
+        "type": "FILE",
+        "differentProductThankYouPage": None,
+        "shortURL": "/test",
+    }
+    items.append(
+        {
+            "type": "file",
+            "action": "create",
+            "metadata": dict(file_metadata, downloadURL="/content/b", md5="md5", sha256="sha256", size=1),
+        }
+    )
+    items.append({"type": "file", "action": "create", "metadata": dict(file_metadata, pushItemPath="files/a")})
+    (tmp_path / "cgw.yaml").write_text(yaml.safe_dump(items))
+
+    Source.register_backend("stage", lambda: [file_push_item, cgw_push_item])
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            push_cgw = PushStagedCGW(["stage:"], "fake_target_name", dict(target_setting, overlapped=True))
+    finally:
+        Source.reset()
+    return push_cgw, file_push_item
+
+
+def cgw_records(records):
+    return [record for scope in records.values() for record in scope.values()]
+
+
+def cgw_files(client):
+    return [record for scope in client.files.values() for record in cgw_records(scope)]
+
+
+def test_overlapped_operations(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+    client = push_cgw.cgw_client
+
+    push_cgw.start_overlapped_operations()
+    push_cgw._overlap.early[0].result()
+
+    # products, versions and files not waiting for Pulp are created invisible right away
+    assert [product["name"] for product in client.products.values()] == ["Overlapped"]
+    assert [version["invisible"] for version in cgw_records(client.product_versions)] == [True]
+    assert [(item["downloadURL"], item["invisible"]) for item in cgw_files(client)] == [("/content/b", True)]
+
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+    push_cgw._overlap.files[0][0].result()
+    assert sorted(item["downloadURL"] for item in cgw_files(client)) == ["/content/b", "test"]
+
+    push_cgw.push_staged_operations()
+
+    assert push_cgw._overlap is None
+    assert [version["invisible"] for version in cgw_records(client.product_versions)] == [False]
+    assert [item["invisible"] for item in cgw_files(client)] == [False, False]
+    assert [item["type"] for item in push_cgw.cgw_item_operations[0]] == ["product", "product_version", "file", "file"]
+
+
+def test_overlapped_file_after_unresolved_sibling_deferred(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+    client = push_cgw.cgw_client
+    items = yaml.safe_load((tmp_path / "cgw.yaml").read_text())
+    # may address the file the staged file resolves to
+    update = {"type": "file", "action": "update", "metadata": dict(items[-2]["metadata"], description="updated")}
+    (tmp_path / "cgw.yaml").write_text(yaml.safe_dump(items + [update]))
+
+    update_file_calls = len(client.update_file.calls)
+    push_cgw.start_overlapped_operations()
+    push_cgw._overlap.early[0].result()
+    assert [item["action"] for item in push_cgw._overlap.deferred[0]] == ["create", "update"]
+    assert len(client.update_file.calls) == update_file_calls
+
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+    push_cgw.push_staged_operations()
+    # the update runs after the staged file is created
+    assert [(item["action"], item["metadata"].get("downloadURL")) for item in push_cgw.cgw_item_operations[0]][2:] == [
+        ("create", "/content/b"),
+        ("create", "test"),
+        ("update", "/content/b"),
+    ]
+
+
+def test_overlapped_operations_keep_groups(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+
+    with mock.patch("pubtools._content_gateway.push_staged_cgw.group_related", wraps=group_related) as patched:
+        push_cgw.start_overlapped_operations()
+        groups = push_cgw._overlap.groups
+        push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+        with mock.patch.object(
+            PushStagedCGW, "process_cgw_push_items", wraps=push_cgw.process_cgw_push_items
+        ) as processed:
+            push_cgw.push_staged_operations()
+
+    # the remaining items aren't regrouped by the keys left to them
+    patched.assert_called_once()
+    assert processed.call_args.kwargs["groups"] is groups
+
+
+def test_overlapped_operations_started_by_entry_point(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+    # Pulp published the push item before the CGW operations started
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+
+    with mock.patch("pubtools._content_gateway.push_staged_cgw.PushStagedCGW", return_value=push_cgw):
+        try:
+            assert entry_point(["stage:"], "fake_target_name", target_setting) is push_cgw
+        finally:
+            pm.unregister(push_cgw)
+
+    assert len(push_cgw._overlap.files[0]) == 1
+    push_cgw.push_staged_operations()
+
+    assert sorted(item["downloadURL"] for item in cgw_files(push_cgw.cgw_client)) == ["/content/b", "test"]
+    assert [item["invisible"] for item in cgw_files(push_cgw.cgw_client)] == [False, False]
+
+
+def test_overlapped_operations_rolled_back(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path, version_product="Missing")
+    client = push_cgw.cgw_client
+
+    push_cgw.start_overlapped_operations()
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+
+    with pytest.raises(Exception):
+        push_cgw.push_staged_operations()
+
+    # the product created during the Pulp push is rolled back too
+    assert client.products == {}
+    assert push_cgw._overlap is None
+
+
+def test_overlapped_operations_aborted_when_pulp_push_fails(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+    client = push_cgw.cgw_client
+
+    pm.register(push_cgw)
+    try:
+        push_cgw.start_overlapped_operations()
+        overlap = push_cgw._overlap
+        overlap.early[0].result()
+        assert [product["name"] for product in client.products.values()] == ["Overlapped"]
+
+        # the Pulp push fails, push_staged_operations is never called
+        pm.hook.task_stop(failed=True)
+    finally:
+        pm.unregister(push_cgw)
+
+    assert push_cgw._overlap is None
+    assert client.products == {}
+    assert cgw_records(client.product_versions) == []
+    assert cgw_files(client) == []
+    assert [item["type"] for item in push_cgw.cgw_item_operations[0]] == ["product", "product_version", "file"]
+    # no thread is left behind
+    assert overlap.executor._shutdown
+    assert overlap.file_executor._shutdown
+    assert push_cgw._checksum_executor is None
+
+    # nothing to abort anymore
+    push_cgw.abort_overlapped_operations()
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+    assert cgw_files(client) == []
+
+
+def test_overlapped_operations_deadline_excludes_pulp_push(target_setting, tmp_path):
+    push_cgw, file_push_item = overlapped_push(target_setting, tmp_path)
+    push_cgw.deadline = 60
+
+    push_cgw.start_overlapped_operations()
+    forks = push_cgw._overlap.forks
+    assert push_cgw._deadline_at is None
+
+    push_cgw.pulp_item_push_finished([get_pulp_push_item()], file_push_item)
+    push_cgw.push_staged_operations()
+
+    assert push_cgw._deadline_at is not None
+    assert [fork._deadline_at for fork in forks] == [push_cgw._deadline_at]
+
+
+def test_invalid_cgw_push_items_reported_at_once(target_setting, tmp_path):
+    first = write_cgw_yaml(tmp_path, "first.yaml", "First")
+    second = write_cgw_yaml(tmp_path, "second.yaml", "Second")
+    for path in (first.src, second.src):
+        items = yaml.safe_load(open(path).read())
+        del items[1]["metadata"]["termsAndConditions"]
+        with open(path, "w") as f:
+            f.write(yaml.safe_dump(items))
+    Source.register_backend("stage", lambda: [first, second])
+    try:
+        with mock.patch("pubtools._content_gateway.push_base.CGWClient", return_value=TestClient()):
+            push_cgw = PushStagedCGW(["stage:"], "fake_target_name", target_setting)
+    finally:
+        Source.reset()
+
+    with pytest.raises(CGWError) as exception:
+        push_cgw.push_staged_operations()
+
+    assert str(exception.value).startswith("2 out of 4 CGW items are invalid:\n%s item 1" % first.src)
+    assert "%s item 1 (product_version Second)" % second.src in str(exception.value)
+    assert push_cgw.cgw_client.products == {}
@@ -0,0 +1,118 @@
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from pubtools._content_gateway.rate_limiter import RateLimiter, jittered, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after("-5") == 0
+    with mock.patch("pubtools._content_gateway.rate_limiter.time.time", return_value=1445412480):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT") == 10
+
+
+def test_jittered():
+    with mock.patch("pubtools._content_gateway.rate_limiter.random.random", return_value=0.5):
+        assert jittered(8, 0.5) == 6
+        assert jittered(8, 0) == 8
+
+
+def test_unlimited_until_throttled():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    assert [limiter.reserve() for _ in range(10)] == [0] * 10
+    limiter.on_success()
+    assert limiter.rate is None
+
+    clock.now += 1
+    limiter.on_throttle()
+    # 10 requests in a second observed, halved
+    assert limiter.rate == 5
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    limiter = RateLimiter(max_rate=2, clock=clock)
+
+    assert [limiter.reserve() for _ in range(4)] == [0, 0, 0.5, 1]
+    clock.now += 2
+    assert limiter.reserve() == 0
+
+
+def test_aimd():
+    clock = FakeClock()
+    limiter = RateLimiter(max_rate=8, clock=clock)
+
+    limiter.on_throttle()
+    assert limiter.rate == 4
+    # throttled responses to the requests sent at once decrease the rate once
+    limiter.on_throttle()
+    assert limiter.rate == 4
+
+    clock.now += 1
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 2
+
+    limiter.on_success()
+    assert limiter.rate == 2.5
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 8
+
+    for _ in range(10):
+        clock.now += 1
+        limiter.on_throttle()
+    assert limiter.rate == limiter.min_rate
+
+
+def test_retry_after_pauses_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    limiter.on_throttle(retry_after=30)
+    assert limiter.reserve() == 30
+    clock.now += 10
+    assert limiter.reserve() == 20
+
+
+@mock.patch("pubtools._content_gateway.rate_limiter.time.sleep")
+def test_wait(patched_sleep):
+    clock = FakeClock()
+    limiter = RateLimiter(max_rate=1, clock=clock)
+
+    limiter.wait()
+    patched_sleep.assert_not_called()
+    limiter.wait()
+    patched_sleep.assert_called_once_with(1)
+
+
+@mock.patch("pubtools._content_gateway.rate_limiter.time.sleep")
+def test_pause_capped(patched_sleep):
+    clock = FakeClock()
+    limiter = RateLimiter(max_pause=60, clock=clock)
+
+    limiter.on_throttle(retry_after=3600)
+    assert limiter.reserve() == 60
+
+    limiter.deadline = clock.now + 5
+    assert limiter.cap(30) == 5
+    limiter.wait()
+    patched_sleep.assert_called_once_with(5)
+
+    clock.now += 10
+    assert limiter.cap(30) == 0
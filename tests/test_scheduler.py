@@ -0,0 +1,177 @@
+import threading
+
+import pytest
+
+from pubtools._content_gateway.scheduler import OperationScheduler, build_dependencies, group_related, item_key
+from pubtools._content_gateway.utils import sort_items
+
+
+def product(name, action="create"):
+    return {"type": "product", "action": action, "metadata": {"name": name, "productCode": "code"}}
+
+
+def version(product_name, name, action="create"):
+    return {
+        "type": "product_version",
+        "action": action,
+        "metadata": {"productName": product_name, "productCode": "code", "versionName": name},
+    }
+
+
+def file(product_name, version_name, url, action="create"):
+    return {
+        "type": "file",
+        "action": action,
+        "metadata": {
+            "productName": product_name,
+            "productCode": "code",
+            "productVersionName": version_name,
+            "downloadURL": url,
+        },
+    }
+
+
+def test_item_key():
+    assert item_key(product("p1")) == ("p1", "code")
+    assert item_key(version("p1", "v1")) == ("p1", "code", "v1")
+    assert item_key(file("p1", "v1", "/url")) == ("p1", "code", "v1", "/url")
+    staged_file = file("p1", "v1", "/url")
+    staged_file["metadata"]["pushItemPath"] = staged_file["metadata"].pop("downloadURL")
+    assert item_key(staged_file) == ("p1", "code", "v1")
+    assert item_key({"type": "unknown"}) is None
+
+
+def test_unresolved_file_ordered_with_its_siblings():
+    staged_file = file("p1", "v1", None)
+    staged_file["metadata"]["pushItemPath"] = "files/a"
+    deleted_file = dict(file("p1", "v1", "/content/a"), action="delete")
+    items = [staged_file, file("p1", "v1", "/content/b"), deleted_file, file("p1", "v2", "/content/a")]
+
+    dependencies, _ = build_dependencies([item_key(item) for item in items])
+
+    # the delete may address the file the staged file resolves to
+    assert dependencies == [set(), {0}, {0}, set()]
+
+
+def test_build_dependencies():
+    items = sort_items(
+        [
+            product("p1"),
+            product("p2"),
+            version("p1", "v1"),
+            version("p2", "v1"),
+            file("p1", "v1", "/f1"),
+            file("p1", "v1", "/f2"),
+            file("p2", "v1", "/f3", action="delete"),
+            version("p2", "v1", action="delete"),
+        ]
+    )
+    dependencies, dependents = build_dependencies([item_key(item) for item in items])
+
+    # products don't depend on anything
+    assert dependencies[0] == set() and dependencies[1] == set()
+    # versions depend on their product only
+    assert dependencies[2] == {0}
+    assert dependencies[3] == {1}
+    # files depend on their product and version
+    assert dependencies[4] == {0, 2}
+    assert dependencies[5] == {0, 2}
+    # deleted version waits for the deleted file
+    assert dependencies[6] == {1, 3}
+    assert dependencies[7] == {1, 3, 6}
+    assert dependents[2] == [4, 5]
+
+
+def test_scheduler_runs_in_dependency_order():
+    items = sort_items(
+        [
+            file("p1", "v1", "/f1"),
+            file("p1", "v1", "/f1", action="delete"),
+            version("p1", "v1"),
+            version("p1", "v1", action="delete"),
+            product("p1"),
+            product("p1", action="delete"),
+            file("p2", "v1", "/f2"),
+            version("p2", "v1"),
+            product("p2"),
+        ]
+    )
+    done = []
+    lock = threading.Lock()
+
+    def process(item):
+        with lock:
+            done.append(item)
+
+    OperationScheduler(items, workers=4).run(process)
+
+    assert len(done) == len(items)
+    position = {id(item): index for index, item in enumerate(done)}
+    dependencies, _ = build_dependencies([item_key(item) for item in items])
+    for index, depends_on in enumerate(dependencies):
+        for dependency in depends_on:
+            assert position[id(items[dependency])] < position[id(items[index])]
+
+
+def test_scheduler_runs_independent_items_concurrently():
+    items = [file("p1", "v%s" % index, "/file") for index in range(3)]
+    barrier = threading.Barrier(3, timeout=5)
+
+    OperationScheduler(items, workers=3).run(lambda item: barrier.wait())
+
+
+def test_scheduler_stops_on_error():
+    items = sort_items([product("p1"), version("p1", "v1"), file("p1", "v1", "/f1")])
+    done = []
+
+    def process(item):
+        if item["type"] == "product_version":
+            raise ValueError("version failed")
+        done.append(item)
+
+    with pytest.raises(ValueError) as exception:
+        OperationScheduler(items, workers=2).run(process)
+
+    assert str(exception.value) == "version failed"
+    assert done == [items[0]]
+
+
+def test_group_related():
+    assert group_related([]) == []
+    assert group_related([{"a"}, {"b"}, set(), {"c", "a"}, {"d", "c"}, {"b"}]) == [[0, 3, 4], [1, 5], [2]]
+    # sets joined through a later set
+    assert group_related([{"a"}, {"b"}, {"a", "b"}]) == [[0, 1, 2]]
+
+
+def test_scheduler_reads_items_as_needed():
+    read = []
+    processed = []
+
+    def items():
+        for index in range(5):
+            read.append(index)
+            yield product("p%s" % index)
+
+    def process(item):
+        # no more than the running and the next ready item are read
+        assert len(read) <= len(processed) + 2
+        processed.append(item)
+
+    OperationScheduler(items(), workers=1).run(process)
+
+    assert [item["metadata"]["name"] for item in processed] == ["p0", "p1", "p2", "p3", "p4"]
+
+
+def test_scheduler_waits_for_ready_dependencies():
+    items = sort_items([product("p1"), version("p1", "v1"), file("p1", "v1", "/f1"), file("p1", "v1", "/f2")])
+    done = []
+    lock = threading.Lock()
+
+    def process(item):
+        with lock:
+            done.append(item)
+
+    OperationScheduler(iter(items), workers=4).run(process)
+
+    assert done[:2] == items[:2]
+    assert len(done) == 4
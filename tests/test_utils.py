@@ -1,5 +1,33 @@
+import copy
+import hashlib
 import os
-from pubtools._content_gateway.utils import yaml_parser, validate_data, sort_items, format_cgw_items
+
+import jsonschema
+import pytest
+import yaml
+from yaml.loader import SafeLoader
+
+from pubtools._content_gateway.utils import (
+    FILE_SCHEMA,
+    PRODUCT_SCHEMA,
+    VERSION_SCHEMA,
+    CompiledSchema,
+    yaml_parser,
+    yaml_items,
+    validate_data,
+    process_context,
+    validate_items,
+    sort_items,
+    iter_collect_parents,
+    iter_sorted_items,
+    format_cgw_items,
+    file_checksums,
+)
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
 
 test_data_dir = os.path.join(os.path.dirname(__file__), "test_data")
 
@@ -23,3 +51,266 @@ def test_yml_data_formats(yml_json_data):
     cgw_items = yaml_parser(yaml_file)
     formatted_cgw_data = format_cgw_items(cgw_items)
     assert formatted_cgw_data == yml_json_data
+
+
+def test_file_checksums(tmp_path):
+    data = os.urandom(10000)
+    file_path = tmp_path / "artifact.iso"
+    file_path.write_bytes(data)
+
+    expected = {
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": 10000,
+    }
+    assert file_checksums(str(file_path)) == expected
+    assert file_checksums(str(file_path), chunk_size=3) == expected
+
+
+def test_file_checksums_empty_file(tmp_path):
+    file_path = tmp_path / "empty"
+    file_path.write_bytes(b"")
+
+    assert file_checksums(str(file_path)) == {
+        "md5": hashlib.md5(b"").hexdigest(),
+        "sha256": hashlib.sha256(b"").hexdigest(),
+        "size": 0,
+    }
+
+
+def test_yaml_parser_first_document(tmp_path):
+    yaml_file = tmp_path / "cgw.yaml"
+    yaml_file.write_text("- type: product\n---\n- not: parsed\n  - invalid\n")
+    assert yaml_parser(str(yaml_file)) == [{"type": "product"}]
+
+    yaml_file.write_text("")
+    with pytest.raises(ValueError):
+        yaml_parser(str(yaml_file))
+
+
+@pytest.mark.parametrize("name", ["test_cgw_push.yaml", "test_yml_format.yaml", "test_cgw_push_staged.yaml"])
+def test_yaml_loaders_identical(name):
+    yaml_file = os.path.join(test_data_dir, name)
+    with open(yaml_file) as f:
+        expected = yaml.load(f, Loader=SafeLoader)
+
+    assert yaml_parser(yaml_file) == expected
+    assert list(yaml_items(yaml_file)) == expected
+    with mock.patch("pubtools._content_gateway.utils.YAML_STREAM_LOADER", SafeLoader):
+        assert list(yaml_items(yaml_file)) == expected
+
+
+def test_yaml_items_streamed(tmp_path):
+    yaml_file = tmp_path / "cgw.yaml"
+    yaml_file.write_text("- &product {type: product}\n- *product\n- [unclosed\n")
+
+    items = yaml_items(str(yaml_file))
+    assert next(items) == {"type": "product"}
+    assert next(items) == {"type": "product"}
+    # the broken item is parsed only when it is requested
+    with pytest.raises(yaml.YAMLError):
+        next(items)
+
+
+def test_yaml_items_not_list(tmp_path):
+    yaml_file = tmp_path / "cgw.yaml"
+    yaml_file.write_text("type: product\n")
+    with pytest.raises(ValueError):
+        list(yaml_items(str(yaml_file)))
+
+    yaml_file.write_text("")
+    with pytest.raises(ValueError):
+        list(yaml_items(str(yaml_file)))
+
+
+def file_item(**metadata):
+    return {
+        "type": "file",
+        "action": "create",
+        "metadata": dict({"productName": "p", "productCode": "c", "productVersionName": "v"}, **metadata),
+    }
+
+
+VALIDATED_ITEMS = [
+    file_item(pushItemPath="a"),
+    file_item(downloadURL="/a", size=1, md5=None),
+    file_item(pushItemPath="a", downloadURL="/a"),
+    file_item(),
+    file_item(pushItemPath=1),
+    file_item(downloadURL="/a", order=1.5),
+    file_item(downloadURL="/a", order=1.0),
+    file_item(downloadURL="/a", hidden=1),
+    {"type": "file", "action": "create", "metadata": None},
+    {"type": "file", "action": "create", "metadata": ["pushItemPath"]},
+    {"type": "file", "action": "move", "metadata": {"pushItemPath": "a"}},
+    {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": None, "eloquaCode": 1}},
+    {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": None}},
+    {"type": "product_version", "action": "create", "metadata": {"productName": "p"}},
+]
+
+
+@pytest.mark.parametrize("item", VALIDATED_ITEMS)
+def test_validate_data_same_as_jsonschema(item):
+    schema = {"product": PRODUCT_SCHEMA, "product_version": VERSION_SCHEMA, "file": FILE_SCHEMA}[item["type"]]
+    try:
+        jsonschema.validate(instance=item, schema=schema)
+    except jsonschema.ValidationError as error:
+        expected = error
+    else:
+        expected = None
+
+    if expected is None:
+        assert validate_data(item) is True
+    else:
+        with pytest.raises(jsonschema.ValidationError) as exception:
+            validate_data(item)
+        assert str(exception.value) == str(expected)
+
+
+class FakeJsonSchemaException(Exception):
+    pass
+
+
+def test_compiled_schema_fast_path():
+    fast_validate = mock.Mock(side_effect=[None, FakeJsonSchemaException("rejected")])
+    with mock.patch("pubtools._content_gateway.utils.fastjsonschema") as fastjsonschema:
+        fastjsonschema.compile.return_value = fast_validate
+        fastjsonschema.JsonSchemaException = FakeJsonSchemaException
+        schema = CompiledSchema(PRODUCT_SCHEMA)
+
+        # accepted by the generated code
+        assert schema.is_valid({}) is True
+        # rejected items are checked by jsonschema
+        with pytest.raises(jsonschema.ValidationError):
+            schema.validate({})
+
+    fastjsonschema.compile.assert_called_once_with(PRODUCT_SCHEMA)
+    assert fast_validate.call_count == 2
+
+
+@pytest.mark.parametrize("item", VALIDATED_ITEMS)
+def test_fastjsonschema_same_as_jsonschema(item):
+    pytest.importorskip("fastjsonschema")
+    schema = {"product": PRODUCT_SCHEMA, "product_version": VERSION_SCHEMA, "file": FILE_SCHEMA}[item["type"]]
+    compiled = CompiledSchema(schema)
+    assert compiled._fast_validate is not None
+    assert compiled.is_valid(item) == compiled.validator.is_valid(item)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_validate_items(workers):
+    items = [
+        file_item(pushItemPath="a"),
+        file_item(),
+        {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": "c", "eloquaCode": 1}},
+        {"type": "product", "action": "create", "metadata": {"name": "p", "productCode": "c"}},
+        {"type": "file", "action": "create", "metadata": None},
+    ]
+
+    errors = validate_items(items, workers=workers, chunk_size=2)
+
+    assert [(error["index"], error["type"], error["productCode"]) for error in errors] == [
+        (1, "file", "c"),
+        (3, "product", "c"),
+        (4, "file", None),
+    ]
+    assert errors[1]["error"] == "metadata: 'eloquaCode' is a required property"
+    assert validate_items(items[:1] + items[2:3], workers=workers, chunk_size=1) == []
+
+
+def test_process_context():
+    assert process_context().get_start_method() in ("forkserver", "spawn")
+
+
+def test_format_cgw_items_keeps_input_intact(yml_json_data):
+    items = yaml_parser(os.path.join(test_data_dir, "test_yml_format.yaml"))
+    original = copy.deepcopy(items)
+
+    formatted = format_cgw_items(items)
+
+    assert formatted == yml_json_data
+    assert items == original
+    # the discarded nested records aren't part of the linear records
+    for item in formatted:
+        assert "releases" not in item["metadata"] and "files" not in item["metadata"]
+
+
+def cgw_item(item_type, action, *key):
+    fields = {
+        "product": ("name", "productCode"),
+        "product_version": ("productName", "productCode", "versionName"),
+        "file": ("productName", "productCode", "productVersionName", "downloadURL"),
+    }[item_type]
+    return {"type": item_type, "action": action, "metadata": dict(zip(fields, key))}
+
+
+def test_iter_sorted_items():
+    items = [
+        cgw_item("file", "create", "p1", "c", "v1", "/f1"),
+        cgw_item("file", "delete", "p2", "c", "v1", "/f2"),
+        cgw_item("product_version", "create", "p1", "c", "v1"),
+        cgw_item("product", "delete", "p2", "c"),
+        cgw_item("product", "create", "p1", "c"),
+        cgw_item("product_version", "delete", "p2", "c", "v1"),
+        cgw_item("file", "update", "p1", "c", "v1", "/f3"),
+        cgw_item("product_version", "update", "p3", "c", "v1"),
+        cgw_item("file", "create", "p3", "c", "v1", "/f4"),
+        cgw_item("file", "create", "p4", "c", "v1", "/f5"),
+        {"type": "unknown", "action": "create"},
+    ]
+
+    assert list(iter_sorted_items(items)) == [
+        # the product releases its waiting version, the version its waiting file
+        items[4],
+        items[2],
+        items[0],
+        items[6],
+        # the parents of these never come
+        items[7],
+        items[8],
+        items[9],
+        # deletes
+        items[1],
+        items[5],
+        items[3],
+    ]
+    # the same items as sort_items, created parents before their children, deleted children before their parents
+    assert sorted(map(id, iter_sorted_items(items))) == sorted(map(id, sort_items(items)))
+
+
+def test_iter_sorted_items_with_known_parents():
+    items = [
+        cgw_item("product_version", "create", "p1", "c", "v1"),
+        cgw_item("file", "create", "p2", "c", "v1", "/f1"),
+        cgw_item("product", "create", "p1", "c"),
+        cgw_item("product_version", "create", "p2", "c", "v2"),
+        cgw_item("file", "delete", "p2", "c", "v1", "/f2"),
+    ]
+    parents = set()
+
+    assert list(iter_collect_parents(items, parents)) == items
+    assert parents == {("p1", "c"), ("p1", "c", "v1"), ("p2", "c", "v2")}
+    # only the version of the created product waits, the other items are yielded as they are read
+    assert list(iter_sorted_items(items, parents)) == [items[1], items[2], items[0], items[3], items[4]]
+
+
+def test_iter_sorted_items_streamed():
+    read = []
+
+    def items():
+        for index in range(100):
+            read.append(index)
+            yield cgw_item("product", "create", "p%s" % index, "c")
+
+    sorted_items = iter_sorted_items(items())
+    assert next(sorted_items)["metadata"]["name"] == "p0"
+    assert read == [0]
+
+
+def test_validate_items_streamed():
+    def items():
+        for index in range(5):
+            yield file_item(pushItemPath="a") if index != 3 else file_item()
+
+    assert [error["index"] for error in validate_items(items(), workers=2, chunk_size=2)] == [3]
+    assert [error["index"] for error in validate_items(items(), chunk_size=2)] == [3]